@@ -0,0 +1,53 @@
+"""
+get_accel on a long session: per-index lstsq (local_slope) vs the vectorized rolling slope
+
+python3 ./benchmarks/bench_accel.py [--samples 1000000] [--reference 20000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+
+from core.kinematics import get_accel, local_slope
+
+def synthetic_session(n, fps=25.0):
+    rng = np.random.default_rng(0)
+    speed = np.clip(150 + np.cumsum(rng.normal(0, 0.8, n)), 0, 350).round()
+    v = speed / 3.6
+    distance = np.concatenate(([0.0], np.cumsum((v[:-1] + v[1:]) / 2 / fps)))
+    return speed, distance
+
+def reference_accel(speeds, distance, window=5):
+    return np.array([speeds[i] * local_slope(distance, speeds, i, window) * 25 / 324 for i in range(len(speeds))])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    parser.add_argument("--reference", type=int, default=20_000, help="samples timed with the per-index loop")
+    args = parser.parse_args()
+
+    speed, distance = synthetic_session(args.samples)
+
+    begin = time.perf_counter()
+    accel = get_accel(speed, distance)
+    vectorized = time.perf_counter() - begin
+    print(f"vectorized  {args.samples:>9} samples: {vectorized:8.3f} s")
+
+    m = min(args.reference, args.samples)
+    begin = time.perf_counter()
+    ref = reference_accel(speed[:m], distance[:m])
+    loop = time.perf_counter() - begin
+    print(f"lstsq loop  {m:>9} samples: {loop:8.3f} s (~{loop * args.samples / m:.1f} s for {args.samples})")
+
+    # 两边都在同一个子区间上算，末端窗口的截断方式一致
+    diff = np.abs(get_accel(speed[:m], distance[:m]) - ref).max()
+    print(f"max |difference| on the reference range: {diff:.3e}")
+    print(f"speedup: ~{loop * args.samples / m / vectorized:.0f}x")
+    assert len(accel) == args.samples
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+distance integration on a long session: the old per-row iloc loop vs integrate_distance
+
+python3 ./benchmarks/bench_distance.py [--rows 500000] [--reference 20000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+import pandas as pd
+
+from core.kinematics import integrate_distance
+from core.video_processor import regen_df_by_time_speed
+
+def synthetic_session(n, fps=25.0):
+    rng = np.random.default_rng(0)
+    speed = np.clip(150 + np.cumsum(rng.normal(0, 0.8, n)), 0, 350).round()
+    return pd.DataFrame({"frame": np.arange(n), "speed": speed, "time": np.arange(n) / fps})
+
+def loop_distance(df: pd.DataFrame):
+    """regen_df_by_time_speed before it used integrate_distance"""
+    distance = [0]
+    for i in range(1, len(df)):
+        t0, v0 = df["time"].iloc[i - 1], df["speed"].iloc[i - 1]
+        t1, v1 = df["time"].iloc[i], df["speed"].iloc[i]
+        v0_mps = v0 / 3.6
+        v1_mps = v1 / 3.6
+        delta_t = t1 - t0
+        s = distance[-1] + ((v0_mps + v1_mps) / 2) * delta_t
+        distance.append(s)
+    return np.array(distance, dtype=np.float64)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--reference", type=int, default=20_000, help="rows timed with the per-row loop")
+    args = parser.parse_args()
+
+    df = synthetic_session(args.rows)
+
+    begin = time.perf_counter()
+    distance = integrate_distance(df["time"].values, df["speed"].values)
+    vectorized = time.perf_counter() - begin
+    print(f"integrate_distance     {args.rows:>8} rows: {vectorized:8.4f} s")
+
+    begin = time.perf_counter()
+    regen_df_by_time_speed(df.copy())
+    regen = time.perf_counter() - begin
+    print(f"regen_df_by_time_speed {args.rows:>8} rows: {regen:8.4f} s (distance + accel)")
+
+    m = min(args.reference, args.rows)
+    begin = time.perf_counter()
+    ref = loop_distance(df.iloc[:m])
+    loop = time.perf_counter() - begin
+    print(f"iloc loop              {m:>8} rows: {loop:8.4f} s (~{loop * args.rows / m:.1f} s for {args.rows})")
+
+    same = np.array_equal(ref, distance[:m])
+    print(f"bit-identical to the loop: {same}")
+    print(f"speedup: ~{loop * args.rows / m / vectorized:.0f}x")
+
+if __name__ == "__main__":
+    main()
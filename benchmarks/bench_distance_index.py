@@ -0,0 +1,84 @@
+"""
+distance -> row index: the old SortedDict index vs DistanceIndex (needs sortedcontainers for the reference)
+
+python3 ./benchmarks/bench_distance_index.py [--rows 500000] [--queries 200000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+from sortedcontainers import SortedDict
+
+from core.distance_index import DistanceIndex
+
+class SortedDictIndex():
+    """SDAnalyzer.build_sd / get_index before DistanceIndex"""
+    def __init__(self, distances):
+        self._sd = SortedDict()
+        for i, distance in enumerate(distances):
+            if self._sd.get(distance) is None:
+                self._sd[distance] = i
+
+    def get_index(self, distance):
+        keys = self._sd.keys()
+        index = self._sd.bisect_left(distance)
+        candidates = []
+        if index < len(keys):
+            candidates.append(keys[index])
+        if index < len(keys) - 1:
+            candidates.append(keys[index + 1])
+        if index > 0:
+            candidates.append(keys[index - 1])
+        if not candidates:
+            return None
+        closest_key = min(candidates, key=lambda k: abs(k - distance))
+        return self._sd[closest_key]
+
+def synthetic_distance(n, fps=25.0):
+    rng = np.random.default_rng(0)
+    speed = np.clip(150 + np.cumsum(rng.normal(0, 0.8, n)), 0, 350).round()
+    # 一段停车，制造重复的距离
+    speed[n // 3:n // 3 + 500] = 0
+    v = speed / 3.6
+    return np.concatenate(([0.0], np.cumsum((v[:-1] + v[1:]) / 2 / fps)))
+
+def timed(label, func):
+    begin = time.perf_counter()
+    result = func()
+    print(f"{label:<40} {time.perf_counter() - begin:8.4f} s")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--queries", type=int, default=200_000)
+    args = parser.parse_args()
+
+    distance = synthetic_distance(args.rows)
+    rng = np.random.default_rng(1)
+    queries = np.concatenate((
+        rng.uniform(-100, distance[-1] + 100, args.queries),
+        distance[rng.integers(0, len(distance), 1000)],                    # 正好落在某个距离上
+        (distance[:-1] + distance[1:])[rng.integers(0, len(distance) - 1, 1000)] / 2,   # 两点正中间
+    ))
+
+    old = timed(f"SortedDict build ({args.rows} rows)", lambda: SortedDictIndex(distance))
+    new = timed(f"DistanceIndex build ({args.rows} rows)", lambda: DistanceIndex(distance))
+
+    ref = timed(f"SortedDict get_index x{len(queries)}", lambda: [old.get_index(q) for q in queries])
+    one = timed(f"DistanceIndex.nearest x{len(queries)}", lambda: [new.nearest(q) for q in queries])
+    many = timed(f"DistanceIndex.nearest_many ({len(queries)})", lambda: new.nearest_many(queries))
+    print(f"same rows as SortedDict: nearest {one == ref}, nearest_many {many.tolist() == ref}")
+
+    step = 10.0
+    timed("SortedDict rebuild after adjust_distance", lambda: SortedDictIndex(distance + step))
+    timed("DistanceIndex.shift", lambda: new.shift(step))
+    shifted = DistanceIndex(distance + step)
+    print(f"shift equals rebuild: {np.array_equal(new.keys, shifted.keys) and np.array_equal(new.rows, shifted.rows)}")
+
+if __name__ == "__main__":
+    main()
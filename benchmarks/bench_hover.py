@@ -0,0 +1,101 @@
+"""
+one hover update (what VisCanvas/AccelCanvas.on_mouse_move do per analyzer) with several laps loaded:
+pandas Series indexing vs the LapArrays view
+
+python3 ./benchmarks/bench_hover.py [--laps 8] [--samples 100000] [--events 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from core.kinematics import integrate_distance, get_accel
+from core.sd_analyzer import SDAnalyzer
+
+class SeriesAnalyzer(SDAnalyzer):
+    """hover accessors reading self.df['col'][idx] like before LapArrays"""
+    def set_current_index_by_distance(self, distance):
+        idx = self.get_index(distance)
+        self.current_index = idx if idx is not None else 0
+        return self.df['distance'][idx] + self.offset
+
+    def draw_point(self, distance=-1):
+        if self.point is None:
+            self.point, = self.ax.plot([], [], 'o')
+        index = self.get_index(distance)
+        if index:
+            self.point.set_data([distance], [self.df['speed'][index]])
+
+    def draw_accel_point(self, distance, ax):
+        if self.accel_point is None:
+            self.accel_point, = ax.plot([], [], 'o')
+        index = self.get_index(distance)
+        if index:
+            self.accel_point.set_data([distance], [self.df['accel'][index]])
+
+    def get_speed(self, distance):
+        index = self.get_index(distance)
+        if index and self.df.get('speed') is not None:
+            return self.df['speed'][index]
+        return 0
+
+    def get_current_accel(self):
+        return self.df['accel'][self.current_index]
+
+    def get_current_frame_index(self):
+        return self.df["frame"][self.current_index]
+
+def synthetic_lap(n, seed, fps=25.0):
+    rng = np.random.default_rng(seed)
+    speed = np.clip(150 + np.cumsum(rng.normal(0, 0.8, n)), 20, 350).round().astype(np.int64)
+    t = np.arange(n) / fps
+    distance = integrate_distance(t, speed)
+    return pd.DataFrame({"frame": np.arange(n), "speed": speed, "distance": distance, "time": t,
+                         "accel": get_accel(speed, distance)})
+
+def hover(analyzers, ax, distance):
+    """body of VisCanvas.on_mouse_move + AccelCanvas point update, without the canvas redraw"""
+    for instance in analyzers:
+        instance.set_current_index_by_distance(distance)
+        instance.draw_accel_point(distance, ax)
+        instance.draw_point(distance)
+        instance.get_current_frame_index()
+    return f'distance: {distance:.2f}m\n' + '\n'.join(
+        f" V{i}: {item.get_speed(distance):.2f}km/h, a: {item.get_current_accel() / 9.8:.2f}" for i, item in enumerate(analyzers))
+
+def run(cls, laps, ax, queries):
+    analyzers = [cls(ax, name=f"lap{i}", data_frame=df) for i, df in enumerate(laps)]
+    for a in analyzers:
+        a.draw_line()
+    hover(analyzers, ax, queries[0])
+    begin = time.perf_counter()
+    for q in queries:
+        hover(analyzers, ax, q)
+    return (time.perf_counter() - begin) / len(queries)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--laps", type=int, default=8)
+    parser.add_argument("--samples", type=int, default=100_000)
+    parser.add_argument("--events", type=int, default=2000)
+    args = parser.parse_args()
+
+    laps = [synthetic_lap(args.samples, i) for i in range(args.laps)]
+    _, ax = plt.subplots()
+    queries = np.random.default_rng(0).uniform(0, laps[0]["distance"].iloc[-1], args.events)
+
+    old = run(SeriesAnalyzer, laps, ax, queries)
+    new = run(SDAnalyzer, laps, ax, queries)
+    print(f"{args.laps} laps, one hover update: pandas Series {old * 1e6:8.1f} us, LapArrays {new * 1e6:8.1f} us "
+          f"({old / new:.1f}x)")
+
+if __name__ == "__main__":
+    main()
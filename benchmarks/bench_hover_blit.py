@@ -0,0 +1,77 @@
+"""
+hover update latency with several long laps: full redraw vs blitting the moving markers over a cached background
+
+python3 ./benchmarks/bench_hover_blit.py [--laps 3] [--samples 300000] [--moves 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from core.kinematics import integrate_distance
+from core.sd_analyzer import SDAnalyzer
+from widgets.hover_blit import HoverBlitter
+
+def synthetic_lap(n, seed, fps=25.0):
+    rng = np.random.default_rng(seed)
+    speed = np.clip(150 + np.cumsum(rng.normal(0, 0.8, n)), 20, 350).round()
+    t = np.arange(n) / fps
+    return pd.DataFrame({"frame": np.arange(n), "speed": speed, "time": t,
+                         "distance": integrate_distance(t, speed)})
+
+def hover(analyzers, anno, distance):
+    for a in analyzers:
+        a.set_current_index_by_distance(distance)
+        a.draw_point(distance)
+    anno.set_text(f"distance: {distance:.2f}m")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--laps", type=int, default=3)
+    parser.add_argument("--samples", type=int, default=300_000)
+    parser.add_argument("--moves", type=int, default=50)
+    args = parser.parse_args()
+
+    fig, ax = plt.subplots(figsize=(12, 4))
+    analyzers = [SDAnalyzer(ax, data_frame=synthetic_lap(args.samples, seed), name=str(seed)) for seed in range(args.laps)]
+    for a in analyzers:
+        a.draw_line()
+    ax.legend()
+    anno = ax.text(0.005, 0.02, "", transform=ax.transAxes, animated=True)
+    blitter = HoverBlitter(fig.canvas, lambda: [a.point for a in analyzers] + [anno], [ax])
+
+    end = min(a.get_distance_range()[1] for a in analyzers)
+    distances = np.linspace(0, end, args.moves)
+    hover(analyzers, anno, 0.0)
+    fig.canvas.draw()
+
+    begin = time.perf_counter()
+    for d in distances:
+        hover(analyzers, anno, d)
+        fig.canvas.draw()
+    full = (time.perf_counter() - begin) / args.moves
+    full_frame = np.asarray(fig.canvas.buffer_rgba()).copy()
+
+    fig.canvas.draw()
+    begin = time.perf_counter()
+    for d in distances:
+        hover(analyzers, anno, d)
+        blitter.blit()
+    blit = (time.perf_counter() - begin) / args.moves
+    # blit 后的画面应和完整重绘一致
+    same = np.array_equal(np.asarray(fig.canvas.buffer_rgba()), full_frame)
+
+    print(f"{args.laps} laps x {args.samples} samples, {args.moves} mouse moves")
+    print(f"full redraw {full * 1e3:7.2f} ms/move")
+    print(f"blit        {blit * 1e3:7.2f} ms/move ({full / blit:.0f}x), same pixels as the full redraw: {same}")
+
+if __name__ == "__main__":
+    main()
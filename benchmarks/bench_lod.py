@@ -0,0 +1,79 @@
+"""
+redraw time of the speed trace with and without the min/max level of detail, for growing session lengths
+
+python3 ./benchmarks/bench_lod.py [--samples 10000 100000 1000000] [--laps 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from core.kinematics import integrate_distance
+from core.sd_analyzer import SDAnalyzer
+
+def synthetic_lap(n, seed, fps=25.0):
+    rng = np.random.default_rng(seed)
+    speed = np.clip(150 + np.cumsum(rng.normal(0, 0.8, n)), 20, 350).round()
+    t = np.arange(n) / fps
+    return pd.DataFrame({"frame": np.arange(n), "speed": speed, "time": t,
+                         "distance": integrate_distance(t, speed)})
+
+def redraw_time(fig, repeat = 5):
+    fig.canvas.draw()
+    begin = time.perf_counter()
+    for _ in range(repeat):
+        fig.canvas.draw()
+    return (time.perf_counter() - begin) / repeat
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--laps", type=int, default=3)
+    args = parser.parse_args()
+
+    for n in args.samples:
+        laps = [synthetic_lap(n, seed) for seed in range(args.laps)]
+
+        fig, ax = plt.subplots(figsize=(10, 4))
+        for df in laps:
+            ax.plot(df["distance"], df["speed"])
+        full = redraw_time(fig)
+        plt.close(fig)
+
+        fig, ax = plt.subplots(figsize=(10, 4))
+        analyzers = [SDAnalyzer(ax, data_frame=df, name=str(i)) for i, df in enumerate(laps)]
+        for a in analyzers:
+            a.draw_line()
+        lod = redraw_time(fig)
+        drawn = sum(len(a.line.get_xdata()) for a in analyzers)
+
+        # 峰值、谷值和范围都要保留
+        for a, df in zip(analyzers, laps):
+            y = a.line.get_ydata()
+            assert y.max() == df["speed"].max() and y.min() == df["speed"].min()
+            assert a.line.get_xdata()[0] == df["distance"].iloc[0] and a.line.get_xdata()[-1] == df["distance"].iloc[-1]
+
+        # 放大到一小段，点数仍然和像素宽度同一量级，且这段内的极值不丢
+        d = laps[0]["distance"].to_numpy()
+        x0, x1 = d[len(d) // 3], d[len(d) // 3 + len(d) // 50]
+        ax.set_xlim(x0, x1)
+        zoom = redraw_time(fig)
+        inside = (d >= x0) & (d <= x1)
+        y = analyzers[0].line.get_ydata()
+        assert y.max() >= laps[0]["speed"].to_numpy()[inside].max()
+        zoom_drawn = len(analyzers[0].line.get_xdata())
+        plt.close(fig)
+
+        print(f"{args.laps} laps x {n:>8} samples: full {full * 1e3:8.1f} ms, "
+              f"lod {lod * 1e3:6.1f} ms ({drawn} points), zoomed {zoom * 1e3:6.1f} ms ({zoom_drawn} points per lap)")
+
+if __name__ == "__main__":
+    main()
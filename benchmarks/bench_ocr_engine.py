@@ -0,0 +1,68 @@
+"""
+per-frame OCR cost: pytesseract (subprocess + temp image) vs resident TesseractEngine
+
+python3 ./benchmarks/bench_ocr_engine.py [--frames 200] [--video v.mp4 --roi X Y W H]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import cv2
+import numpy as np
+import pytesseract
+
+from core.tess_engine import get_tess_engine
+
+def synthetic_crops(n):
+    rng = np.random.default_rng(0)
+    crops = []
+    for v in rng.integers(0, 300, n):
+        img = np.full((48, 110, 3), 20, np.uint8)
+        cv2.putText(img, str(v), (8, 38), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 2)
+        crops.append(img)
+    return crops
+
+def video_crops(path, roi, n):
+    cap = cv2.VideoCapture(path)
+    x, y, w, h = roi
+    crops = []
+    while len(crops) < n:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        crops.append(frame[y:y+h, x:x+w].copy())
+    return crops
+
+def bench(name, fn, crops):
+    begin = time.perf_counter()
+    texts = [fn(c) for c in crops]
+    per_frame = (time.perf_counter() - begin) / len(crops) * 1000
+    print(f"{name:<12} {per_frame:8.2f} ms/frame")
+    return texts
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--video")
+    parser.add_argument("--roi", nargs=4, type=int)
+    args = parser.parse_args()
+
+    crops = video_crops(args.video, args.roi, args.frames) if args.video else synthetic_crops(args.frames)
+
+    config = r'--oem 3 --psm 6 outputbase digits'
+    subprocess_texts = bench("pytesseract", lambda c: pytesseract.image_to_string(c, config=config).strip(), crops)
+
+    engine = get_tess_engine()
+    if engine is None:
+        print("libtesseract not found, set TESSERACT_LIB to benchmark the resident engine")
+        return
+    resident_texts = bench("resident", lambda c: engine.read(c)[0].strip(), crops)
+
+    same = sum(a == b for a, b in zip(subprocess_texts, resident_texts))
+    print(f"identical results: {same}/{len(crops)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+adaptive sampling vs full-rate OCR on the bundled traces, using the recorded speeds as the OCR oracle
+
+python3 ./benchmarks/bench_sampling.py [--fps 25] [--steps 4 8 16]
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import numpy as np
+import pandas as pd
+
+from core.sampling import adaptive_sample, max_delta_per_frame
+
+TRACES = ["distance_speed_su7u.mp4.csv", "distance_speed_u9x.mp4.csv"]
+
+def distance_of(speeds, fps):
+    v = np.asarray(speeds, dtype=np.float64) / 3.6
+    return np.concatenate(([0.0], np.cumsum((v[:-1] + v[1:]) / 2 / fps)))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fps", type=float, default=25.0)
+    parser.add_argument("--steps", type=int, nargs="+", default=[4, 8, 16])
+    args = parser.parse_args()
+
+    for name in TRACES:
+        speeds = pd.read_csv(os.path.join(ROOT, name))["speed"].to_numpy(dtype=np.float64)
+        full = distance_of(speeds, args.fps)
+        print(f"{name}: {len(speeds)} frames, {full[-1]:.1f} m")
+
+        for step in args.steps:
+            calls = []
+            def read(i):
+                if i >= len(speeds):
+                    return None
+                calls.append(i)
+                return speeds[i], True
+
+            samples = adaptive_sample(read, 0, len(speeds), step, max_delta_per_frame(args.fps))
+            sampled = distance_of([v for _, v, _ in samples], args.fps)
+            err = np.abs(sampled - full)
+            print(f"  step {step:>2}: OCR calls {len(calls):>6} ({len(speeds) / len(calls):4.1f}x fewer), "
+                  f"final distance error {sampled[-1] - full[-1]:+7.2f} m, max error {err.max():6.2f} m")
+
+if __name__ == "__main__":
+    main()
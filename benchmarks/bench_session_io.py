@@ -0,0 +1,66 @@
+"""
+loading/saving dozens of long laps: csv (pd.read_csv / to_csv) vs the .npz session format
+
+python3 ./benchmarks/bench_session_io.py [--laps 30] [--samples 200000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+import pandas as pd
+
+from core.kinematics import integrate_distance, get_accel
+from core.session_file import save_session, load_session
+
+def synthetic_lap(n, seed, fps=25.0):
+    rng = np.random.default_rng(seed)
+    speed = np.clip(150 + np.cumsum(rng.normal(0, 0.8, n)), 20, 350).round().astype(np.int64)
+    t = np.arange(n) / fps
+    distance = integrate_distance(t, speed)
+    return pd.DataFrame({"frame": np.arange(n), "speed": speed, "distance": distance,
+                         "time": t, "accel": get_accel(speed, distance)})
+
+def timed(fn, items):
+    begin = time.perf_counter()
+    out = [fn(item) for item in items]
+    return time.perf_counter() - begin, out
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--laps", type=int, default=30)
+    parser.add_argument("--samples", type=int, default=200_000)
+    args = parser.parse_args()
+
+    laps = [synthetic_lap(args.samples, seed) for seed in range(args.laps)]
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_paths = [os.path.join(tmp, f"lap{i}_database.csv") for i in range(args.laps)]
+        npz_paths = [os.path.join(tmp, f"lap{i}_database.npz") for i in range(args.laps)]
+
+        csv_save, _ = timed(lambda p: laps[csv_paths.index(p)].to_csv(p, index=False, encoding="utf-8-sig"), csv_paths)
+        npz_save, _ = timed(lambda p: save_session(p, laps[npz_paths.index(p)], {"distance_offset": 0.0}), npz_paths)
+        csv_load, csv_dfs = timed(pd.read_csv, csv_paths)
+        npz_load, npz_out = timed(load_session, npz_paths)
+
+        csv_size = sum(os.path.getsize(p) for p in csv_paths)
+        npz_size = sum(os.path.getsize(p) for p in npz_paths)
+
+    print(f"{args.laps} laps x {args.samples} samples")
+    print(f"save  csv {csv_save:8.3f} s   npz {npz_save:8.3f} s   ({csv_save / npz_save:.0f}x)")
+    print(f"load  csv {csv_load:8.3f} s   npz {npz_load:8.3f} s   ({csv_load / npz_load:.0f}x)")
+    print(f"size  csv {csv_size / 2**20:8.1f} MB  npz {npz_size / 2**20:8.1f} MB")
+
+    # npz 按位还原，csv 的浮点数经过文本往返
+    for lap, (df, meta) in zip(laps, npz_out):
+        pd.testing.assert_frame_equal(df, lap, check_exact=True)
+        assert meta["distance_offset"] == 0.0
+    for lap, df in zip(laps, csv_dfs):
+        assert np.abs(df["distance"].to_numpy() - lap["distance"].to_numpy()).max() < 1e-9
+    print("round trip: npz bit-identical")
+
+if __name__ == "__main__":
+    main()
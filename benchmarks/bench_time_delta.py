@@ -0,0 +1,81 @@
+"""
+time difference between two laps: the per-row lookup loop vs the np.interp grid of get_time_differences
+
+python3 ./benchmarks/bench_time_delta.py [--samples 100000] [--resolution 1.0]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from core.kinematics import integrate_distance
+from core.sd_analyzer import SDAnalyzer, get_time_differences
+
+def synthetic_lap(n, seed, fps=25.0):
+    rng = np.random.default_rng(seed)
+    speed = np.clip(150 + np.cumsum(rng.normal(0, 0.8, n)), 20, 350).round()
+    t = np.arange(n) / fps
+    return pd.DataFrame({"frame": np.arange(n), "speed": speed, "time": t,
+                         "distance": integrate_distance(t, speed)})
+
+def loop_time_differences(sd1:SDAnalyzer, sd2:SDAnalyzer):
+    """get_time_differences before the interpolation grid (second start time taken from sd2)"""
+    i1 = sd1.get_index(0)
+    i2 = sd2.get_index(0)
+    distances = []
+    times = []
+    t1 = sd1.df['time'][i1]
+    t2 = sd2.df['time'][i2]
+    d1 = sd1.get_distances()
+    for i in range(i1, len(sd1.df)):
+        distance = d1[i]
+        j1 = sd1.get_index(distance)
+        j2 = sd2.get_index(distance)
+        distances.append(distance)
+        times.append((sd1.df['time'][j1] - t1) - (sd2.df['time'][j2] - t2))
+    return pd.DataFrame({"time_d": times, "distance": distances})
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=100_000)
+    parser.add_argument("--resolution", type=float, default=1.0)
+    args = parser.parse_args()
+
+    _, ax = plt.subplots()
+    sd1 = SDAnalyzer(ax, name="a", data_frame=synthetic_lap(args.samples, 0))
+    sd2 = SDAnalyzer(ax, name="b", data_frame=synthetic_lap(args.samples, 1))
+    sd1.draw_line()
+    sd2.draw_line()
+
+    begin = time.perf_counter()
+    ref = loop_time_differences(sd1, sd2)
+    loop = time.perf_counter() - begin
+    print(f"per-row loop            {len(ref):>8} points: {loop:8.4f} s")
+
+    for resolution in (args.resolution, None):
+        runs = []
+        for step in range(20):
+            # 模拟拖动对齐：每次都带着新的偏移重新计算
+            sd2.adjust_distance(1.0 if step % 2 == 0 else -1.0)
+            begin = time.perf_counter()
+            data = get_time_differences(sd1, sd2, resolution)
+            runs.append(time.perf_counter() - begin)
+        label = f"grid {resolution} m" if resolution is not None else "grid = sd1 samples"
+        print(f"{label:<23} {len(data):>8} points: {np.median(runs) * 1000:8.2f} ms per drag step")
+
+    data = get_time_differences(sd1, sd2, None)
+    common = np.intersect1d(ref["distance"].values, data["distance"].values)
+    a = ref.drop_duplicates("distance").set_index("distance")["time_d"].loc[common].values
+    b = data.set_index("distance")["time_d"].loc[common].values
+    print(f"max |interpolated - nearest-row| on sd1 samples: {np.abs(a - b).max():.4f} s")
+
+if __name__ == "__main__":
+    main()
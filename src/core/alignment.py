@@ -0,0 +1,86 @@
+import numpy as np
+
+# 自动对齐时的距离网格（m）
+DEFAULT_ALIGN_RESOLUTION = 1.0
+# 重叠部分至少占较短一圈的比例，避免只靠两端几米对上
+DEFAULT_MIN_OVERLAP = 0.5
+
+def resample_speed(distances, speeds, resolution = DEFAULT_ALIGN_RESOLUTION):
+    """speed on a uniform distance grid starting at the first distance, returns (start, values)"""
+    d = np.asarray(distances, dtype=np.float64)
+    v = np.asarray(speeds, dtype=np.float64)
+    valid = ~(np.isnan(d) | np.isnan(v))
+    d, v = d[valid], v[valid]
+    # 停车时距离重复，保留第一行
+    d, first = np.unique(d, return_index=True)
+    v = v[first]
+    if len(d) < 2:
+        return (d[0] if len(d) else 0.0), v
+    grid = np.arange(d[0], d[-1], resolution)
+    return d[0], np.interp(grid, d, v)
+
+def cross_correlation(a, b):
+    """
+    c[k] = sum_i a[i + k] * b[i] for every lag k in [-(len(b) - 1), len(a) - 1] via FFT,
+    returns (lags, c)
+    """
+    n = len(a) + len(b) - 1
+    nfft = 1 << (n - 1).bit_length()
+    c = np.fft.irfft(np.fft.rfft(a, nfft) * np.conj(np.fft.rfft(b, nfft)), nfft)
+    lags = np.arange(-(len(b) - 1), len(a))
+    return lags, c[lags % nfft]
+
+def normalized_cross_correlation(a, b):
+    """
+    pearson correlation of the overlapping parts of a and b for every lag (same lags as cross_correlation),
+    the window sums come from prefix sums so the whole thing stays O(n log n)
+    """
+    a = a - a.mean()
+    b = b - b.mean()
+    lags, c = cross_correlation(a, b)
+    lo = np.maximum(0, -lags)
+    hi = np.minimum(len(b), len(a) - lags)
+    n = hi - lo
+
+    pa = np.concatenate(([0.0], np.cumsum(a)))
+    paa = np.concatenate(([0.0], np.cumsum(a * a)))
+    pb = np.concatenate(([0.0], np.cumsum(b)))
+    pbb = np.concatenate(([0.0], np.cumsum(b * b)))
+    sa, saa = pa[hi + lags] - pa[lo + lags], paa[hi + lags] - paa[lo + lags]
+    sb, sbb = pb[hi] - pb[lo], pbb[hi] - pbb[lo]
+
+    var = (saa - sa * sa / n) * (sbb - sb * sb / n)
+    cov = c - sa * sb / n
+    ncc = np.divide(cov, np.sqrt(np.maximum(var, 0)), out=np.zeros_like(cov), where=var > 0)
+    return lags, n, ncc
+
+def speed_trace_offset(distances_a, speeds_a, distances_b, speeds_b, resolution = DEFAULT_ALIGN_RESOLUTION,
+                       max_shift = None, refine = True, min_overlap = DEFAULT_MIN_OVERLAP):
+    """
+    distance offset to add to trace b so that its speed trace lines up with trace a.
+    lags are scored by the normalized correlation of the overlapping parts, refine fits a parabola
+    through the peak for a sub-resolution offset. max_shift limits |offset| in metres.
+    None when no lag has enough overlap
+    """
+    start_a, va = resample_speed(distances_a, speeds_a, resolution)
+    start_b, vb = resample_speed(distances_b, speeds_b, resolution)
+    if len(va) < 3 or len(vb) < 3:
+        return None
+
+    lags, overlap, score = normalized_cross_correlation(va, vb)
+    valid = overlap >= max(3, min_overlap * min(len(va), len(vb)))
+    offsets = start_a - start_b + lags * resolution
+    if max_shift is not None:
+        valid &= np.abs(offsets) <= max_shift
+    if not valid.any():
+        return None
+
+    score = np.where(valid, score, -np.inf)
+    k = int(np.argmax(score))
+    offset = offsets[k]
+    if refine and 0 < k < len(score) - 1 and valid[k - 1] and valid[k + 1]:
+        y0, y1, y2 = score[k - 1], score[k], score[k + 1]
+        denom = y0 - 2 * y1 + y2
+        if denom < 0:
+            offset += 0.5 * (y0 - y2) / denom * resolution
+    return float(offset)
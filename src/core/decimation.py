@@ -0,0 +1,137 @@
+import numpy as np
+from matplotlib.lines import Line2D
+
+class MinMaxPyramid():
+    """
+    min/max 抽稀金字塔：第 k 层每个桶覆盖 2**k 个原始点，保存桶内最小、最大值的原始下标，
+    按像素宽度选层后每个像素最多画几个点，峰值和谷值不会被抽掉
+    """
+    def __init__(self, x, y):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        n = len(self.x)
+        # 距离单调时才能按 xlim 截取可见部分（有 NaN 或者回退时整条抽稀）
+        self.sorted = n < 2 or bool(np.all(self.x[1:] >= self.x[:-1]))
+
+        nan = np.isnan(self.y)
+        low = np.where(nan, np.inf, self.y)
+        high = np.where(nan, -np.inf, self.y)
+        # levels[k-1] = (imin, imax)，第 0 层就是原始数据
+        self.levels = []
+        imin = imax = np.arange(n)
+        while len(imin) > 1:
+            if len(imin) % 2:
+                imin = np.append(imin, imin[-1])
+                imax = np.append(imax, imax[-1])
+            a, b = imin[0::2], imin[1::2]
+            imin = np.where(low[b] < low[a], b, a)
+            a, b = imax[0::2], imax[1::2]
+            imax = np.where(high[b] > high[a], b, a)
+            self.levels.append((imin, imax))
+
+    def __len__(self):
+        return len(self.x)
+
+    def visible(self, x0, x1):
+        """raw index range [lo, hi) covering [x0, x1] plus one point on each side"""
+        n = len(self.x)
+        if not self.sorted:
+            return 0, n
+        lo = max(0, int(np.searchsorted(self.x, x0, side="left")) - 1)
+        hi = min(n, int(np.searchsorted(self.x, x1, side="right")) + 1)
+        return lo, hi
+
+    def level_for(self, count, pixels):
+        """coarsest level that still has at least one bucket per pixel"""
+        if pixels <= 0 or count <= 2 * pixels:
+            return 0
+        return min(len(self.levels), int(np.log2(count / pixels)))
+
+    def indices(self, lo, hi, level):
+        """raw indices drawn for [lo, hi) at the given level, in increasing order"""
+        if level == 0 or hi - lo < 2:
+            return np.arange(lo, hi)
+        imin, imax = self.levels[level - 1]
+        jlo = lo >> level
+        jhi = min(len(imin), ((hi - 1) >> level) + 1)
+        a, b = imin[jlo:jhi], imax[jlo:jhi]
+        idx = np.column_stack((np.minimum(a, b), np.maximum(a, b))).ravel()
+        # 保留首尾点，曲线的范围（relim 用）和原始数据一致
+        if jlo == 0:
+            idx = np.concatenate(([0], idx))
+        if jhi == len(imin):
+            idx = np.concatenate((idx, [len(self.x) - 1]))
+        return idx
+
+class DecimatedLine():
+    """
+    keeps the full trace of a Line2D and hands it only the min/max level matching the current
+    xlim and axes width, refreshed on xlim changes and canvas resizes
+    """
+    def __init__(self, line: Line2D, x = None, y = None):
+        self.line = line
+        if x is None:
+            x, y = line.get_xdata(), line.get_ydata()
+        self._key = None
+        self.pyramid = MinMaxPyramid(x, y)
+        self._xlim_cid = line.axes.callbacks.connect("xlim_changed", lambda ax: self.refresh())
+        self._resize_cid = line.figure.canvas.mpl_connect("resize_event", lambda event: self.refresh())
+        self.refresh()
+
+    @property
+    def axes(self):
+        return self.line.axes
+
+    @property
+    def x(self):
+        return self.pyramid.x
+
+    @property
+    def y(self):
+        return self.pyramid.y
+
+    def set_data(self, x, y):
+        """new full trace, drawn at the level for its whole range so relim() sees the full extents"""
+        self.pyramid = MinMaxPyramid(x, y)
+        self._key = None
+        self._show(0, len(self.pyramid))
+
+    def set_xdata(self, x):
+        self.set_data(x, self.pyramid.y)
+        self.refresh()
+
+    def set_transform(self, transform):
+        # 距离偏移改变时可见的原始区间也跟着变
+        self.line.set_transform(transform)
+        self.refresh()
+
+    def _view(self):
+        """visible data x range and its width in pixels, through the line's own transform (offset included)"""
+        bbox = self.line.axes.bbox
+        inv = self.line.get_transform().inverted()
+        (x0, _), (x1, _) = inv.transform([[bbox.x0, bbox.y0], [bbox.x1, bbox.y0]])
+        return min(x0, x1), max(x0, x1), bbox.width
+
+    def _show(self, lo, hi, pixels = None):
+        if pixels is None:
+            pixels = self.line.axes.bbox.width
+        level = self.pyramid.level_for(hi - lo, pixels)
+        if level > 0:
+            # 桶对齐，平移一点点不用重新 set_data
+            lo, hi = (lo >> level) << level, min(len(self.pyramid), ((hi >> level) + 1) << level)
+        key = (lo, hi, level)
+        if key == self._key:
+            return
+        self._key = key
+        idx = self.pyramid.indices(lo, hi, level)
+        self.line.set_data(self.pyramid.x[idx], self.pyramid.y[idx])
+
+    def refresh(self):
+        x0, x1, pixels = self._view()
+        lo, hi = self.pyramid.visible(x0, x1)
+        self._show(lo, hi, pixels)
+
+    def remove(self):
+        self.line.axes.callbacks.disconnect(self._xlim_cid)
+        self.line.figure.canvas.mpl_disconnect(self._resize_cid)
+        self.line.remove()
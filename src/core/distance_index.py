@@ -0,0 +1,63 @@
+import numpy as np
+
+class DistanceIndex():
+    """
+    distance -> row lookup over a sorted float64 array.
+    每个距离只保留第一次出现的行；最近邻按 bisect 位置、后一个、前一个的顺序比较，距离相同取先比较的
+    """
+    def __init__(self, distances):
+        self.build(distances)
+
+    def build(self, distances):
+        d = np.asarray(distances, dtype=np.float64)
+        # return_index 使用稳定排序，得到的是每个值第一次出现的行
+        self.keys, rows = np.unique(d[~np.isnan(d)], return_index=True)
+        self.rows = np.flatnonzero(~np.isnan(d))[rows]
+
+    def shift(self, step):
+        """same result as build(distances + step) without sorting again"""
+        keys = self.keys + step
+        if len(keys) > 1 and not (keys[1:] > keys[:-1]).all():
+            # 加法保序，只可能因为舍入出现相等的距离，保留行号最小的那个
+            starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+            self.rows = np.minimum.reduceat(self.rows, starts)
+            keys = keys[starts]
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def nearest(self, distance):
+        """row closest to distance, None when the index is empty"""
+        keys = self.keys
+        n = len(keys)
+        if n == 0:
+            return None
+        i = int(keys.searchsorted(distance)) if distance == distance else 0
+        best, best_diff = -1, None
+        for j in (i, i + 1, i - 1):
+            if 0 <= j < n:
+                diff = abs(keys[j] - distance)
+                if best_diff is None or diff < best_diff:
+                    best, best_diff = j, diff
+        return int(self.rows[best])
+
+    def nearest_many(self, distances):
+        """vectorized nearest() for an array of distances, -1 when the index is empty"""
+        q = np.asarray(distances, dtype=np.float64)
+        keys = self.keys
+        n = len(keys)
+        if n == 0:
+            return np.full(q.shape, -1, dtype=np.int64)
+        i = keys.searchsorted(q)
+        i[np.isnan(q)] = 0
+
+        best = np.minimum(i, n - 1)
+        best_diff = np.where(i < n, np.abs(keys[best] - q), np.inf)
+        for j, valid in ((i + 1, i < n - 1), (i - 1, i > 0)):
+            j = np.clip(j, 0, n - 1)
+            diff = np.abs(keys[j] - q)
+            better = valid & (diff < best_diff)
+            best = np.where(better, j, best)
+            best_diff = np.where(better, diff, best_diff)
+        return self.rows[best]
@@ -0,0 +1,137 @@
+import cv2
+import numpy as np
+
+GLYPH_H = 20
+GLYPH_W = 14
+
+def binarize(frame: cv2.Mat):
+    """Otsu 二值化，数字（占少数的像素）为 1"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    _, binary = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if binary.mean() > 0.5:
+        binary = 1 - binary
+    return binary
+
+def segment_cells(binary):
+    """
+    split a binarized crop into character cells by column projection.
+    returns [(cell, is_small)], is_small marks short blobs such as the decimal point
+    """
+    cols = binary.any(axis=0)
+    if not cols.any():
+        return []
+    # 连续的有效列即为一个字符
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], cols.astype(np.int8), [0]))))
+    runs = edges.reshape(-1, 2)
+
+    cells = []
+    for x0, x1 in runs:
+        part = binary[:, x0:x1]
+        rows = np.flatnonzero(part.any(axis=1))
+        cells.append(part[rows[0]:rows[-1] + 1])
+
+    max_h = max(c.shape[0] for c in cells)
+    return [(c, c.shape[0] < max_h * 0.4) for c in cells]
+
+def normalize_cell(cell):
+    """scale to GLYPH_H keeping aspect ratio, pad to GLYPH_W, zero mean / unit norm vector"""
+    h, w = cell.shape
+    new_w = max(1, min(GLYPH_W, int(round(w * GLYPH_H / h))))
+    scaled = cv2.resize(cell.astype(np.float32), (new_w, GLYPH_H), interpolation=cv2.INTER_AREA)
+    glyph = np.zeros((GLYPH_H, GLYPH_W), np.float32)
+    x0 = (GLYPH_W - new_w) // 2
+    glyph[:, x0:x0 + new_w] = scaled
+
+    vec = glyph.ravel()
+    vec = vec - vec.mean()
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+class GlyphDigitRecognizer():
+    """
+    固定字体的数字识别：
+    先用 tesseract 高置信度的结果学习每个数字的模板，之后按列切分字符并做相关匹配，
+    匹配分数低时再退回 tesseract（置信度够高的结果会继续补充模板）
+    """
+    def __init__(self, fallback, bootstrap_frames = 30, min_score = 0.8, min_confidence = 80):
+        # fallback(frame) -> (text, confidence 0~100)
+        self.fallback = fallback
+        self.bootstrap_frames = bootstrap_frames
+        self.min_score = min_score
+        self.min_confidence = min_confidence
+
+        self._sums = {}
+        self._counts = {}
+        self.chars = []
+        self.templates = np.zeros((0, GLYPH_H * GLYPH_W), np.float32)
+        self.learned_frames = 0
+
+        self.template_hits = 0
+        self.fallbacks = 0
+
+    def is_ready(self):
+        return self.learned_frames >= self.bootstrap_frames and len(self.chars) > 0
+
+    def learn(self, cells, text):
+        """add the cells of a confidently read frame to the templates"""
+        digit_cells = [c for c, small in cells if not small]
+        digits = [ch for ch in text if ch != '.']
+        if len(digit_cells) != len(digits):
+            return False
+
+        for cell, ch in zip(digit_cells, digits):
+            vec = normalize_cell(cell)
+            if ch in self._sums:
+                self._sums[ch] += vec
+                self._counts[ch] += 1
+            else:
+                self._sums[ch] = vec.copy()
+                self._counts[ch] = 1
+
+        self.chars = sorted(self._sums)
+        templates = np.stack([self._sums[ch] / self._counts[ch] for ch in self.chars])
+        norms = np.linalg.norm(templates, axis=1, keepdims=True)
+        self.templates = templates / np.where(norms > 0, norms, 1)
+        self.learned_frames += 1
+        return True
+
+    def match(self, cells):
+        """returns (text, lowest cell score)"""
+        digit_cells = [c for c, small in cells if not small]
+        if not digit_cells or len(self.chars) == 0:
+            return "", 0.0
+
+        vecs = np.stack([normalize_cell(c) for c in digit_cells])
+        scores = vecs @ self.templates.T
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(best)), best]
+
+        text = []
+        digit_iter = iter(best)
+        for _, small in cells:
+            text.append('.' if small else self.chars[next(digit_iter)])
+        return "".join(text), float(best_scores.min())
+
+    def read_text(self, frame: cv2.Mat):
+        cells = segment_cells(binarize(frame))
+        if self.is_ready() and cells:
+            text, score = self.match(cells)
+            if score >= self.min_score:
+                self.template_hits += 1
+                return text
+
+        self.fallbacks += 1
+        text, confidence = self.fallback(frame)
+        if confidence >= self.min_confidence and text and cells:
+            self.learn(cells, text)
+        return text
+
+    def read(self, display_frame, on_err_cb = None):
+        """same signature as get_number_float"""
+        text = self.read_text(display_frame)
+        try:
+            return float(text)
+        except ValueError:
+            if on_err_cb is not None:
+                on_err_cb()
+            return 0.0
@@ -0,0 +1,120 @@
+import json
+import numbers
+import os
+
+JOURNAL_VERSION = 1
+# confidence 为 -1 的记录是采样模式下插值得到的帧
+INTERPOLATED_CONFIDENCE = -1.0
+
+def journal_path_for(video_path, roi):
+    name, _ = os.path.splitext(os.path.basename(video_path))
+    x, y, w, h = roi
+    return os.path.join(os.path.dirname(video_path), f"{name}_{x}_{y}_{w}_{h}.journal")
+
+class ExtractionJournal():
+    """
+    append-only 提取日志：第一行是 json 头（视频、ROI、帧率），之后每行一条
+    frame,time,speed,confidence 记录，按块写入并 flush，崩溃后最多丢失一个块
+    """
+    def __init__(self, path, video_path, roi, frame_rate, block_size = 256):
+        self.path = path
+        self.header = {
+            "version": JOURNAL_VERSION,
+            "video": os.path.abspath(video_path),
+            "video_size": os.path.getsize(video_path) if os.path.exists(video_path) else -1,
+            "roi": [int(v) for v in roi],
+            "fps": float(frame_rate),
+        }
+        self.block_size = block_size
+        self._pending = []
+        self._file = None
+
+    def _matches(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+        except (OSError, ValueError):
+            return False
+        return header == self.header
+
+    def _truncate_partial_line(self):
+        """drop a half-written last record left by a crash"""
+        with open(self.path, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            pos = size
+            while pos > 0:
+                start = max(0, pos - 4096)
+                f.seek(start)
+                data = f.read(pos - start)
+                idx = data.rfind(b"\n")
+                if idx >= 0:
+                    f.truncate(start + idx + 1)
+                    return
+                pos = start
+            f.truncate(0)
+
+    def open(self, resume = True):
+        """open for appending, returns True when existing records of the same video and ROI are kept"""
+        resumed = resume and self._matches()
+        if resumed:
+            self._truncate_partial_line()
+            self._file = open(self.path, "a", encoding="utf-8")
+        else:
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._file.write(json.dumps(self.header) + "\n")
+            self._file.flush()
+        return resumed
+
+    def append(self, frame, time, speed, confidence):
+        # 保留整数读数（easyocr）的类型，恢复后生成的 csv 与内存中的一致
+        speed = int(speed) if isinstance(speed, numbers.Integral) else float(speed)
+        self._pending.append(f"{int(frame)},{float(time)!r},{speed!r},{float(confidence)!r}\n")
+        if len(self._pending) >= self.block_size:
+            self.flush()
+
+    def flush(self):
+        if self._file is None or not self._pending:
+            return
+        self._file.write("".join(self._pending))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending.clear()
+
+    def reset(self):
+        """drop every record, keep the header"""
+        self._pending.clear()
+        if self._file is not None:
+            self._file.close()
+        self.open(resume=False)
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def records(self):
+        """stream (frame, time, speed, confidence) from disk"""
+        self.flush()
+        return read_journal_records(self.path)
+
+def read_journal_header(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.loads(f.readline())
+
+def read_journal_records(path):
+    with open(path, "r", encoding="utf-8") as f:
+        f.readline()
+        for line in f:
+            if not line.endswith("\n"):
+                # 崩溃时写了一半的记录
+                break
+            frame, time, speed, confidence = line.split(",")
+            speed = float(speed) if "." in speed or "e" in speed or "n" in speed else int(speed)
+            yield int(frame), float(time), speed, float(confidence)
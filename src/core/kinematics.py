@@ -0,0 +1,113 @@
+import numpy as np
+
+def integrate_distance(times, speeds, start_distance = 0.0):
+    """
+    cumulative trapezoid of speed (km/h) over time (s), distance in metres.
+    the first value is start_distance; 从前一个距离开始逐项累加，舍入与逐行循环一致
+    """
+    t = np.asarray(times, dtype=np.float64)
+    v = np.asarray(speeds, dtype=np.float64) / 3.6
+    if len(t) == 0:
+        return np.zeros(0)
+    inc = ((v[:-1] + v[1:]) / 2) * (t[1:] - t[:-1])
+    return np.cumsum(np.concatenate(([float(start_distance)], inc)))
+
+def local_slope(x_arr, y_arr, idx, window=5):
+    n = len(x_arr)
+    i0 = max(0, idx - window)
+    i1 = min(n - 1, idx + window)
+    xs = x_arr[i0:i1+1]
+    ys = y_arr[i0:i1+1]
+    if len(xs) < 2:
+        return 0.0
+    A = np.vstack([xs, np.ones_like(xs)]).T
+    slope, _ = np.linalg.lstsq(A, ys, rcond=None)[0]
+    return slope
+
+def _centered_slope(xs, ys):
+    """least-squares slope of each row of ys over xs (2d, one window per row)"""
+    dx = xs - xs.mean(axis=1, keepdims=True)
+    dy = ys - ys.mean(axis=1, keepdims=True)
+    sxx = (dx * dx).sum(axis=1)
+    sxy = (dx * dy).sum(axis=1)
+    # x 不变（停车时 distance 不增长）时斜率取 0
+    return np.divide(sxy, sxx, out=np.zeros_like(sxy), where=sxx > 0)
+
+def rolling_slope(x_arr, y_arr, window=5, block=65536):
+    """
+    local_slope for every index at once.
+    windows are centered on their own mean instead of differencing prefix sums of x and x*x,
+    which would lose all precision once distance reaches tens of kilometres
+    """
+    x = np.asarray(x_arr, dtype=np.float64)
+    y = np.asarray(y_arr, dtype=np.float64)
+    n = len(x)
+    res = np.zeros(n)
+    if n < 2:
+        return res
+
+    size = 2 * window + 1
+    if n >= size:
+        xw = np.lib.stride_tricks.sliding_window_view(x, size)
+        yw = np.lib.stride_tricks.sliding_window_view(y, size)
+        # 分块，避免 n * size 的临时数组过大
+        for s in range(0, len(xw), block):
+            e = min(len(xw), s + block)
+            res[window + s:window + e] = _centered_slope(xw[s:e], yw[s:e])
+
+    # 两端窗口被截断，长度各不相同，单独计算
+    for i in list(range(min(window, n))) + list(range(max(window, n - window), n)):
+        i0 = max(0, i - window)
+        i1 = min(n - 1, i + window)
+        res[i] = _centered_slope(x[None, i0:i1 + 1], y[None, i0:i1 + 1])[0]
+    return res
+
+def get_accel(speeds:list, distance:list, window = 5):
+    speeds = np.asarray(speeds, dtype=np.float64)
+    dv_dx = rolling_slope(distance, speeds, window=window)
+    return speeds * dv_dx * 25 / 324
+
+def _increments(times, speeds_a, speeds_b, k):
+    """trapezoid increment k (between rows k-1 and k) for the given speeds of both rows"""
+    return ((speeds_a / 3.6 + speeds_b / 3.6) / 2) * (times[k] - times[k - 1])
+
+def patch_kinematics(times, speeds, distance, accel, positions, old_speeds, window = 5):
+    """
+    in-place update of distance and accel after speeds[positions] changed from old_speeds.
+    a changed speed only touches the two trapezoids around it, so every later distance moves
+    by a constant offset; accel is recomputed only within +-window rows of the changed rows
+    """
+    n = len(speeds)
+    positions = np.asarray(positions, dtype=np.int64)
+    old_speeds = np.asarray(old_speeds, dtype=np.float64)
+    changed = speeds[positions] != old_speeds
+    positions, old_speeds = positions[changed], old_speeds[changed]
+    if len(positions) == 0:
+        return
+    order = np.argsort(positions)
+    positions, old_speeds = positions[order], old_speeds[order]
+
+    old_v = dict(zip(positions.tolist(), old_speeds.tolist()))
+    ks = np.unique(np.concatenate((positions, positions + 1)))
+    ks = ks[(ks >= 1) & (ks < n)]
+    if len(ks):
+        va = speeds[ks - 1].astype(np.float64)
+        vb = speeds[ks].astype(np.float64)
+        va_old = np.array([old_v.get(k - 1, v) for k, v in zip(ks.tolist(), va.tolist())])
+        vb_old = np.array([old_v.get(k, v) for k, v in zip(ks.tolist(), vb.tolist())])
+        offsets = np.cumsum(_increments(times, va, vb, ks) - _increments(times, va_old, vb_old, ks))
+        bounds = ks.tolist() + [n]
+        for i, offset in enumerate(offsets):
+            distance[bounds[i]:bounds[i + 1]] += offset
+
+    # 合并相邻的 ±window 区间，每段带 window 行上下文重新算
+    ranges = []
+    for p in positions.tolist():
+        s, e = max(0, p - window), min(n, p + window + 1)
+        if ranges and s <= ranges[-1][1]:
+            ranges[-1][1] = max(ranges[-1][1], e)
+        else:
+            ranges.append([s, e])
+    for s, e in ranges:
+        lo, hi = max(0, s - window), min(n, e + window)
+        accel[s:e] = get_accel(speeds[lo:hi], distance[lo:hi], window)[s - lo:e - lo]
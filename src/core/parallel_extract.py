@@ -0,0 +1,136 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from core.video_wrapper import VideoWrapper, RoiVideo
+from core.video_processor import TimeSpeedProcessor
+from core.prefetch import PrefetchReader
+from core.sampling import extract_range_sampled, DEFAULT_MAX_ACCEL_G
+
+# 等待分片时检查 should_stop 的间隔（秒）
+STOP_POLL_INTERVAL = 0.1
+
+def default_worker_count():
+    return max(1, (os.cpu_count() or 1) - 1)
+
+def split_frame_ranges(start: int, end: int, shards: int):
+    """split [start, end) into at most `shards` contiguous (start, end) ranges"""
+    total = max(0, end - start)
+    if total == 0:
+        return []
+    shards = max(1, min(shards, total))
+    step, rest = divmod(total, shards)
+    ranges = []
+    s = start
+    for i in range(shards):
+        e = s + step + (1 if i < rest else 0)
+        ranges.append((s, e))
+        s = e
+    return ranges
+
+def extract_range(video_path, roi, start, end, processor:TimeSpeedProcessor, timing = None):
+    """
+    OCR frames [start, end) of the video into processor, end=None reads to EOF.
+    decoding runs ahead in a PrefetchReader thread; `timing` (dict) receives its stage timing
+    """
+    reader = PrefetchReader(RoiVideo(VideoWrapper(video_path), start, roi), end).start()
+    frames, indices = [], []
+    try:
+        for frame_index, frame in reader:
+            if processor.batch_size <= 1:
+                processor.process_frame(frame, frame_index)
+                continue
+
+            frames.append(frame)
+            indices.append(frame_index)
+            if len(frames) >= processor.batch_size:
+                processor.process_frames(frames, indices)
+                frames, indices = [], []
+    finally:
+        reader.stop()
+
+    if frames:
+        processor.process_frames(frames, indices)
+    if timing is not None:
+        timing.update(reader.timing())
+    return processor
+
+def _extract_range(video_path, roi, start, end, frame_rate, processor_kwargs, sample_step, max_accel_g):
+    processor = TimeSpeedProcessor(frame_rate, **processor_kwargs)
+    if sample_step > 1:
+        if end is None:
+            end = int(VideoWrapper(video_path).get_frame_count())
+        extract_range_sampled(video_path, roi, start, end, processor, sample_step, max_accel_g)
+    else:
+        extract_range(video_path, roi, start, end, processor)
+    return processor.get_result().readings(), processor.ocr_calls, processor.skipped_frames()
+
+def extract_parallel(video_path, roi, start, end=None, workers=None, frame_rate=25.0,
+                     processor_kwargs=None, shards_per_worker=4,
+                     on_shard_done=None, should_stop=None, stats=None, sample_step=1,
+                     max_accel_g=DEFAULT_MAX_ACCEL_G, on_readings=None):
+    """
+    OCR the ROI of frames [start, end) with a process pool.
+    Returns (frame_index, speed, interpolated, confidence) sorted by frame. If `should_stop` returns True the
+    remaining shards are cancelled and only the contiguous prefix is returned,
+    same as stopping the serial loop.
+    `stats` (dict) accumulates "ocr_calls" and "skipped" over finished shards.
+    `on_readings(readings)` receives the merged readings progressively, in frame order, as soon as
+    every earlier shard has finished (used to journal partial results).
+    sample_step > 1 runs the adaptive sampling of core.sampling inside every shard.
+    """
+    if workers is None:
+        workers = default_worker_count()
+    if processor_kwargs is None:
+        processor_kwargs = {}
+    to_eof = end is None
+    if to_eof:
+        end = int(VideoWrapper(video_path).get_frame_count())
+
+    ranges = split_frame_ranges(start, end, workers * shards_per_worker)
+    if not ranges:
+        return []
+    if to_eof:
+        # frame count reported by the container may be short, let the last shard run to EOF
+        ranges[-1] = (ranges[-1][0], None)
+
+    results = [None] * len(ranges)
+    next_shard = 0
+    finished = False
+    # 不用 with：退出 with 会等所有正在跑的分片做完，暂停/保存时界面要卡很久
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = {
+            pool.submit(_extract_range, video_path, roi, s, e, frame_rate, processor_kwargs,
+                        sample_step, max_accel_g): i
+            for i, (s, e) in enumerate(ranges)
+        }
+        while pending:
+            # 定时醒来检查 should_stop，不必等到有分片完成
+            done, _ = wait(pending, timeout=STOP_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = pending.pop(future)
+                results[i], ocr_calls, skipped = future.result()
+                if stats is not None:
+                    stats["ocr_calls"] = stats.get("ocr_calls", 0) + ocr_calls
+                    stats["skipped"] = stats.get("skipped", 0) + skipped
+                if on_shard_done is not None:
+                    on_shard_done(i, ranges[i], results[i])
+
+            while next_shard < len(results) and results[next_shard] is not None:
+                if on_readings is not None:
+                    on_readings(results[next_shard])
+                next_shard += 1
+
+            if should_stop is not None and should_stop():
+                break
+        finished = not pending
+    finally:
+        # 停止（或出错）时取消排队的分片，不等正在跑的分片，它们的结果丢弃
+        pool.shutdown(wait=finished, cancel_futures=not finished)
+
+    merged = []
+    for res in results:
+        if res is None:
+            break
+        merged.extend(res)
+    return merged
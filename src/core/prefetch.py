@@ -0,0 +1,100 @@
+import queue
+import threading
+import time
+
+from core.video_wrapper import RoiVideo
+
+class PrefetchReader():
+    """
+    解码线程：读帧 + 裁剪 ROI（含 copy）后放入有界队列，OCR 线程从队列取。
+    队列满时解码线程阻塞，内存占用固定为 maxsize 个 ROI
+    """
+    def __init__(self, roi_video:RoiVideo, end = None, maxsize = 64):
+        self.roi_video = roi_video
+        self.end = end
+        self.queue = queue.Queue(maxsize)
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        # 解码线程里的异常，放完结束标记后由 get() 重新抛出
+        self._error = None
+        self._done = False
+
+        # 阶段耗时（秒）
+        self.decode_time = 0.0      # 解码 + 裁剪
+        self.producer_wait = 0.0    # 队列满，解码领先于 OCR
+        self.consumer_wait = 0.0    # 队列空，OCR 在等解码
+        self.frames = 0
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _put(self, item):
+        begin = time.perf_counter()
+        while not self._stop_event.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self.producer_wait += time.perf_counter() - begin
+
+    def _run(self):
+        try:
+            while not self._stop_event.is_set():
+                if self.end is not None and self.roi_video.get_cur_index() >= self.end:
+                    break
+                begin = time.perf_counter()
+                frame = self.roi_video.get_next_processed_frame()
+                self.decode_time += time.perf_counter() - begin
+                if frame is None:
+                    break
+                self._put((self.roi_video.get_cur_index() - 1, frame))
+        except BaseException as e:
+            self._error = e
+        finally:
+            # 出错也要放结束标记，不然 get() 会一直阻塞
+            self._put(None)
+
+    def get(self):
+        """returns (frame_index, roi_frame), None at the end of the range; re-raises a decode error"""
+        item = None
+        if not self._done:
+            begin = time.perf_counter()
+            item = self.queue.get()
+            self.consumer_wait += time.perf_counter() - begin
+        if item is None:
+            # 结束标记只有一个，之后的调用直接返回
+            self._done = True
+            if self._error is not None:
+                raise self._error
+            return None
+        self.frames += 1
+        return item
+
+    def __iter__(self):
+        while True:
+            item = self.get()
+            if item is None:
+                return
+            yield item
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread.ident is None:
+            return
+        # 清空队列，让阻塞在 put 上的解码线程退出
+        while self._thread.is_alive():
+            try:
+                self.queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self._thread.join()
+
+    def timing(self):
+        return {
+            "frames": self.frames,
+            "decode": self.decode_time,
+            "decode_ahead": self.producer_wait,
+            "ocr_waiting_decode": self.consumer_wait,
+        }
@@ -0,0 +1,102 @@
+from core.video_wrapper import VideoWrapper
+from core.video_processor import TimeSpeedProcessor
+
+# 赛车纵向加速度上限（g），超过则认为两次采样之间不可信
+DEFAULT_MAX_ACCEL_G = 1.6
+# OCR 读数本身的量化误差（km/h）
+READING_TOLERANCE = 1.0
+
+def max_delta_per_frame(frame_rate, max_accel_g = DEFAULT_MAX_ACCEL_G):
+    """largest plausible speed change (km/h) between two consecutive frames"""
+    return max_accel_g * 9.8 * 3.6 / frame_rate
+
+def adaptive_sample(read, start, end, step = 8, max_delta = 2.5):
+    """
+    每 step 帧 OCR 一次，两次读数的变化超出 max_delta * 间隔（或读取失败）时二分回退到被跳过的帧。
+    read(index) -> (value, ok)，超出视频末尾返回 None。
+    returns [(frame_index, value, interpolated)] for every frame in [start, end)
+    """
+    values = {}
+    out = []
+
+    def get(i):
+        if i not in values:
+            values[i] = read(i)
+        return values[i]
+
+    def fill(a, b):
+        (va, ok_a), (vb, ok_b) = values[a], values[b]
+        if b - a <= 1:
+            out.append((b, vb, False))
+            return
+        if ok_a and ok_b and abs(vb - va) <= max_delta * (b - a) + READING_TOLERANCE:
+            for i in range(a + 1, b):
+                out.append((i, va + (vb - va) * (i - a) / (b - a), True))
+            out.append((b, vb, False))
+            return
+        m = (a + b) // 2
+        get(m)
+        fill(a, m)
+        fill(m, b)
+
+    if start >= end or get(start) is None:
+        return out
+    out.append((start, values[start][0], False))
+
+    a = start
+    while True:
+        b = min(a + step, end - 1)
+        if b <= a:
+            break
+        if get(b) is None:
+            # 帧数信息不准，视频提前结束
+            del values[b]
+            end = b
+            continue
+        fill(a, b)
+        a = b
+    return out
+
+class SampledRoiReader():
+    """random access OCR of ROI frames, skipping forward with grab() so skipped frames are not decoded"""
+    def __init__(self, video_path, roi, processor:TimeSpeedProcessor):
+        self.video = VideoWrapper(video_path)
+        self.roi = roi
+        self.processor = processor
+        self.pos = 0
+        self.failed = set()
+        self.video.set_frame(0)
+
+    def __call__(self, index):
+        if index < self.pos or index - self.pos > 256:
+            self.video.set_frame(index)
+            self.pos = index
+        while self.pos < index:
+            if not self.video.grab():
+                return None
+            self.pos += 1
+
+        frame = self.video.get_next_frame()
+        if frame is None:
+            return None
+        self.pos += 1
+
+        failed = []
+        x, y, w, h = self.roi
+        value = self.processor.ocr(frame[y:y+h, x:x+w].copy(), lambda: failed.append(True))
+        self.processor.ocr_calls += 1
+        if failed:
+            self.failed.add(index)
+        return value, not failed
+
+def extract_range_sampled(video_path, roi, start, end, processor:TimeSpeedProcessor,
+                          step = 8, max_accel_g = DEFAULT_MAX_ACCEL_G):
+    """sampling version of extract_range, interpolated frames are marked in the processor"""
+    reader = SampledRoiReader(video_path, roi, processor)
+    if end is None:
+        end = int(reader.video.get_frame_count())
+    max_delta = max_delta_per_frame(processor.frame_rate, max_accel_g)
+
+    for frame_index, value, interpolated in adaptive_sample(reader, start, end, step, max_delta):
+        processor.append_reading(value, frame_index, interpolated, 0.0 if frame_index in reader.failed else 1.0)
+    return processor
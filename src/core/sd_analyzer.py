@@ -1,32 +1,54 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.axes import Axes
-from sortedcontainers import SortedDict
+from matplotlib.transforms import Affine2D
 import numpy as np
+from typing import List
 
 import os
 
+from core.smoothing import SmoothingConfig, compute_channels
+from core.distance_index import DistanceIndex
+from core.alignment import speed_trace_offset, DEFAULT_ALIGN_RESOLUTION
+from core.sectors import SectorTimer, cumulative_time
+from core.session_file import is_session_file, load_session, save_session
+from core.decimation import DecimatedLine
+
+BATCH_MODES = ["nearest", "linear"]
+# 时间差曲线的距离网格间隔（m）
+DEFAULT_DELTA_RESOLUTION = 1.0
+
 def extract_name_without_extension(path):
     base = os.path.basename(path)
     name,_ = os.path.splitext(base)
     return name
 
-def local_slope(x_arr, y_arr, idx, window=5):
-    n = len(x_arr)
-    i0 = max(0, idx - window)
-    i1 = min(n - 1, idx + window)
-    xs = x_arr[i0:i1+1]
-    ys = y_arr[i0:i1+1]
-    if len(xs) < 2:
-        return 0.0
-    A = np.vstack([xs, np.ones_like(xs)]).T
-    slope, _ = np.linalg.lstsq(A, ys, rcond=None)[0]
-    return slope
+class LapArrays():
+    """
+    contiguous copies of the columns read on hover, rebuilt only when the DataFrame or the smoothing changes.
+    speed/accel are the (filtered) channels that are drawn
+    """
+    __slots__ = ("distance", "speed", "frame", "time", "accel")
+
+    def __init__(self, df: pd.DataFrame, speed, accel):
+        self.distance = np.ascontiguousarray(df['distance'].values, dtype=np.float64)
+        self.speed = np.ascontiguousarray(speed)
+        self.frame = np.ascontiguousarray(df['frame'].values)
+        if 'time' in df:
+            self.time = np.ascontiguousarray(df['time'].values, dtype=np.float64)
+        else:
+            # 旧的 csv 没有 time 列，用速度对距离积分出的累计时间
+            self.time = cumulative_time(self.distance, df['speed'].values)
+        self.accel = accel
 
 class SDAnalyzer():
-    def __init__(self, axes:Axes, speed_distance_path=None, name: str=None, data_frame: pd.DataFrame = None, color=None):
+    def __init__(self, axes:Axes, speed_distance_path=None, name: str=None, data_frame: pd.DataFrame = None, color=None, smoothing: SmoothingConfig = None):
+        # 二进制 session 的 json 头（视频、ROI、帧率、距离偏移），csv 没有
+        self.meta = {}
         if data_frame is not None:
             self.df = data_frame
+        elif is_session_file(speed_distance_path):
+            self.df, self.meta = load_session(speed_distance_path)
         else:
             self.df = pd.read_csv(speed_distance_path)
         
@@ -40,138 +62,301 @@ class SDAnalyzer():
 
         self.color = color
         self.line = None
+        # self.line 上实际画的是按视图抽稀后的点，完整曲线在 trace 里
+        self.trace: DecimatedLine = None
         self.point = None
         self.accel_point = None
 
+        # 对齐用的距离偏移，只作用在查询和曲线的 transform 上，保存/导出/编辑前才写回 df
+        self.offset = float(self.meta.get("distance_offset", 0.0))
+        self._offset_artists = []
+
         self.build_sd()
         self.current_index = 0
 
-    """rebuild sd after adjust distance"""
+        self.smoothing = smoothing if smoothing is not None else SmoothingConfig()
+        self.update_channels()
+
+    """hover and plots read these arrays, recompute after the data changes"""
+    def update_channels(self):
+        self.speed_channel, self.accel_channel = compute_channels(
+            self.df['distance'].values, self.df['speed'].values, self.smoothing, self.df.get('accel'))
+        self.arrays = LapArrays(self.df, self.speed_channel, self.accel_channel)
+        self._sector_timer = None
+        if self.trace is not None:
+            self.trace.set_data(self.df['distance'], self.speed_channel)
+            self.trace.refresh()
+
+    def set_smoothing(self, config: SmoothingConfig):
+        self.smoothing = config
+        self.update_channels()
+
+    """rebuild the distance index after the distance column was replaced"""
     def build_sd(self):
-        self._sd = SortedDict()
-        for i,distance in enumerate(self.df['distance']):
-            if self._sd.get(distance) is None:
-                self._sd[distance] = i
+        self._index = DistanceIndex(self.df['distance'].values)
     
     def draw_line(self, ax:Axes = None):
         if ax is None:
             ax = self.ax
-        self.line, = ax.plot(self.df['distance'], self.df['speed'], label=self.name, picker=True, color=self.color)
+        self.line, = ax.plot(self.df['distance'], self.speed_channel, label=self.name, picker=True, color=self.color)
+        self.trace = DecimatedLine(self.line)
+        self.follow_offset(self.trace)
 
-    def adjust_distance(self, step):
-        self.df['distance'] = self.df['distance'] + step
-        self.line.set_data(self.df['distance'], self.df['speed'])
+    """artist plotted against the distance column, moved with the offset"""
+    def follow_offset(self, artist):
+        self._offset_artists.append(artist)
+        self._apply_offset(artist)
+
+    def _apply_offset(self, artist):
+        artist.set_transform(Affine2D().translate(self.offset, 0) + artist.axes.transData)
+
+    def replace_data(self, df: pd.DataFrame):
+        """new speed/distance data for the same session (after editing)"""
+        self.df = df
         self.build_sd()
+        self.update_channels()
+
+    def adjust_distance(self, step):
+        self.offset += step
+        for artist in self._offset_artists:
+            self._apply_offset(artist)
+
+    def materialize_offset(self):
+        """write the offset into the distance column"""
+        if self.offset == 0:
+            return
+        self.df['distance'] = self.df['distance'] + self.offset
+        self._index.shift(self.offset)
+        self.arrays.distance = np.ascontiguousarray(self.df['distance'].values, dtype=np.float64)
+        self._sector_timer = None
+        self.offset = 0.0
+        for artist in self._offset_artists:
+            artist.set_xdata(self.df['distance'].values)
+            self._apply_offset(artist)
+
+    def save(self, path):
+        """.npz keeps the offset lazy in the header, anything else is exported as csv with the offset applied"""
+        if is_session_file(path):
+            meta = dict(self.meta, name=self.name, distance_offset=self.offset)
+            save_session(path, self.df, meta)
+            return
+        self.materialize_offset()
+        self.df.to_csv(path, index=False, encoding="utf-8-sig")
+
+    def get_distances(self):
+        return self.arrays.distance + self.offset
         
     def get_current_distance(self):
-        return self.df["distance"][self.current_index]        
+        return self.arrays.distance[self.current_index] + self.offset
 
     def draw_accel_point(self, distance, ax:Axes):
         if ax is None:
             ax = self.ax
         if self.accel_point is None:
-            self.accel_point, = ax.plot([], [], 'o', markersize=6, alpha=0.6,
+            # 悬停标记由画布 blit，不进完整重绘
+            self.accel_point, = ax.plot([], [], 'o', markersize=6, alpha=0.6, animated=True,
                                     markerfacecolor=self.line.get_color(),
                                     markeredgecolor='white',
                                     markeredgewidth=1)
         if distance == -1:
-            self.accel_point.set_data([self.df["distance"][self.current_index]], [self.df['accel'][self.current_index]])
+            self.accel_point.set_data([self.arrays.distance[self.current_index] + self.offset], [self.arrays.accel[self.current_index]])
 
         index = self.get_index(distance)
         if index:
-            self.accel_point.set_data([distance], [self.df['accel'][index]])
+            self.accel_point.set_data([distance], [self.arrays.accel[index]])
         
     def draw_point(self, distance=-1):
         if self.point is None:
-            self.point, = self.ax.plot([], [], 'o', markersize=6, alpha=0.6,
+            self.point, = self.ax.plot([], [], 'o', markersize=6, alpha=0.6, animated=True,
                                     markerfacecolor=self.line.get_color(),
                                     markeredgecolor='white',
                                     markeredgewidth=1)
         if distance == -1:
-            self.point.set_data([self.df["distance"][self.current_index]], [self.df['speed'][self.current_index]])
+            self.point.set_data([self.arrays.distance[self.current_index] + self.offset], [self.arrays.speed[self.current_index]])
 
         index = self.get_index(distance)
         if index:
-            self.point.set_data([distance], [self.df['speed'][index]])
+            self.point.set_data([distance], [self.arrays.speed[index]])
     
     def get_speed(self, distance:float):
         index = self.get_index(distance)
-        if index and self.df.get('speed') is not None:
-            return self.df['speed'][index]
+        if index:
+            return self.arrays.speed[index]
         return 0
 
     def get_frame_index(self, distance:float):
         index = self.get_index(distance)
-        if index and self.df.get('frame') is not None:
-            return self.df['frame'][index]
+        if index:
+            return self.arrays.frame[index]
         return 0
     
     def get_current_frame_index(self):
-        return self.df["frame"][self.current_index]
+        return self.arrays.frame[self.current_index]
 
     def set_current_index_by_distance(self, distance:float):
         idx = self.get_index(distance)
         self.current_index = idx if idx is not None else 0
-        return self.df['distance'][idx]
+        return self.arrays.distance[self.current_index] + self.offset
     
     def inc_current_index(self):
         self.current_index = self.current_index + 1
 
-    def get_current_accel(self, window = 5):
-        if self.df.get('accel') is not None:
-            return self.df['accel'][self.current_index]
-        
-        speeds = self.df["speed"].values
-        dv_dx = local_slope(self.df["distance"].values, speeds, self.current_index, window=window)
-        v0 = speeds[self.current_index]
-        return v0 * dv_dx * 25 / 324
+    def get_current_accel(self):
+        return self.arrays.accel[self.current_index]
         
     def get_initial_frame(self) -> int:
         return self.initial_frame
 
     def get_accel(self, distance:float):
         index = self.get_index(distance)
-        if index and self.df.get('accel') is not None:
-            return self.df['accel'][index]
+        if index:
+            return self.arrays.accel[index]
         return 0
 
     def get_index(self, distance:float):
-        keys = self._sd.keys()
-        index = self._sd.bisect_left(distance)
-        candidates = []
-
-        if index < len(keys):
-            candidates.append(keys[index])
-        if index < len(keys) - 1:
-            candidates.append(keys[index + 1])
-        if index > 0:
-            candidates.append(keys[index - 1])
-
-        if not candidates:
+        return self._index.nearest(distance - self.offset)
+
+    def elapsed_time(self, start, end):
+        """time (s) driven from distance start to end, scalars or arrays, NaN where the lap does not cover the span"""
+        if self._sector_timer is None:
+            # 计时用原始读数，不受显示用的滤波影响
+            self._sector_timer = SectorTimer(self.arrays.distance, self.df['speed'].values)
+        return self._sector_timer.elapsed(np.asarray(start, dtype=np.float64) - self.offset,
+                                          np.asarray(end, dtype=np.float64) - self.offset)
+
+    def get_distance_range(self):
+        """(first, last) distance including the offset, None when there is no data"""
+        if len(self._index) == 0:
             return None
+        return self._index.keys[0] + self.offset, self._index.keys[-1] + self.offset
 
-        closest_key = min(candidates, key=lambda k: abs(k - distance))
-        return self._sd[closest_key]
+    def get_indices(self, distances):
+        """get_index for an array of distances"""
+        return self._index.nearest_many(np.asarray(distances, dtype=np.float64) - self.offset)
 
-def get_time_differences(sd1:SDAnalyzer, sd2:SDAnalyzer):
-    i1 = sd1.get_index(0)
-    i2 = sd2.get_index(0)
-    
-    distances = []
-    times = []
-    
-    t1 = sd1.df['time'][i1]
-    t2 = sd1.df['time'][i2]
-    for i in range(i1, len(sd1.df)):
-        distance = sd1.df["distance"][i]
-        i1 = sd1.get_index(distance)
-        i2 = sd2.get_index(distance)
-        if i1 is None or i2 is None:
-            continue
-        t1_df = sd1.df['time'][i1] - t1
-        t2_df = sd2.df['time'][i2] - t2
-        
-        distances.append(distance)
-        times.append(t1_df - t2_df)
-        
-    return pd.DataFrame({"time_d":times, "distance": distances})
+    """
+    array versions of get_speed/get_accel/get_frame_index.
+    mode "nearest" takes the row of get_indices, "linear" interpolates between the rows around each distance
+    (clamped to the first/last row outside the data)
+    """
+    def values_at(self, values, distances, mode = "nearest"):
+        q = np.asarray(distances, dtype=np.float64) - self.offset
+        values = np.asarray(values)
+        if len(self._index) == 0:
+            return np.full(q.shape, np.nan)
+        if mode == "nearest":
+            return values[self._index.nearest_many(q)]
+        if mode == "linear":
+            return np.interp(q, self._index.keys, values[self._index.rows])
+        raise ValueError(f"unknown mode {mode!r}, expected one of {BATCH_MODES}")
+
+    def get_speeds(self, distances, mode = "nearest"):
+        return self.values_at(self.arrays.speed, distances, mode)
+
+    def get_accels(self, distances, mode = "nearest"):
+        return self.values_at(self.arrays.accel, distances, mode)
+
+    def get_times(self, distances, mode = "nearest"):
+        return self.values_at(self.arrays.time, distances, mode)
+
+    def get_frame_indices(self, distances, mode = "nearest"):
+        frames = self.values_at(self.arrays.frame, distances, mode)
+        return frames if mode == "nearest" else np.rint(frames).astype(np.int64)
+
+def distance_grid(analyzers:List[SDAnalyzer], resolution = DEFAULT_DELTA_RESOLUTION):
+    """distances from 0 (or the latest start) to the earliest end that every analyzer covers"""
+    ranges = [a.get_distance_range() for a in analyzers]
+    if any(r is None for r in ranges):
+        return np.zeros(0)
+    start = max([0.0] + [r[0] for r in ranges])
+    end = min(r[1] for r in ranges)
+    if end < start:
+        return np.zeros(0)
+    if resolution is None:
+        # 用第一个的采样点
+        d = analyzers[0].get_distances()
+        return np.unique(d[(d >= start) & (d <= end)])
+    return np.append(np.arange(start, end, resolution), end)
+
+def get_time_differences(sd1:SDAnalyzer, sd2:SDAnalyzer, resolution = DEFAULT_DELTA_RESOLUTION):
+    """
+    time_d = (t1(d) - t1(start)) - (t2(d) - t2(start)) on a common distance grid,
+    times are linearly interpolated between samples; resolution None uses sd1's own distances
+    """
+    distances = distance_grid([sd1, sd2], resolution)
+    t1 = sd1.get_times(distances, "linear")
+    t2 = sd2.get_times(distances, "linear")
+    if len(distances):
+        t1 = t1 - t1[0]
+        t2 = t2 - t2[0]
+    return pd.DataFrame({"time_d": t1 - t2, "distance": distances})
+
+def auto_align(reference:SDAnalyzer, lap:SDAnalyzer, resolution = DEFAULT_ALIGN_RESOLUTION, max_shift = None, refine = True):
+    """shift lap so its speed trace lines up with the reference, returns the applied step (None if not aligned)"""
+    offset = speed_trace_offset(reference.get_distances(), reference.df['speed'].values,
+                                lap.get_distances(), lap.df['speed'].values,
+                                resolution=resolution, max_shift=max_shift, refine=refine)
+    if offset is not None:
+        lap.adjust_distance(offset)
+    return offset
+
+class LapDeltaMatrix():
+    """
+    time differences of several laps against one reference lap on the reference's distance grid.
+    row of a lap = (t_ref(d) - t_ref(start)) - (t_lap(d) - t_lap(start)), same sign as get_time_differences(reference, lap);
+    NaN where the lap has no data. 加一圈只需要对这一圈插值一次
+    """
+    def __init__(self, reference:SDAnalyzer, resolution = DEFAULT_DELTA_RESOLUTION):
+        self.reference = reference
+        self.resolution = resolution
+        self.rows = {}
+        self._build_grid()
+
+    def _build_grid(self):
+        self.grid = distance_grid([self.reference], self.resolution)
+        self.ref_times = self.reference.get_times(self.grid, "linear")
+        if len(self.grid):
+            self.ref_times = self.ref_times - self.ref_times[0]
+        self.rows.clear()
+
+    def resample(self, lap:SDAnalyzer):
+        """one lap's delta row, computed only from the lap's own data"""
+        times = lap.get_times(self.grid, "linear")
+        distance_range = lap.get_distance_range()
+        if distance_range is None or len(self.grid) == 0:
+            return np.full(len(self.grid), np.nan)
+        covered = (self.grid >= distance_range[0]) & (self.grid <= distance_range[1])
+        if not covered.any():
+            return np.full(len(self.grid), np.nan)
+        # 从这一圈覆盖到的第一个网格点开始计时
+        times = times - times[np.argmax(covered)]
+        ref_times = self.ref_times - self.ref_times[np.argmax(covered)]
+        row = ref_times - times
+        row[~covered] = np.nan
+        return row
+
+    def invalidate(self, lap:SDAnalyzer):
+        """the lap's distance changed (alignment), the reference moving invalidates every row"""
+        if lap is self.reference:
+            self._build_grid()
+        else:
+            self.rows.pop(lap, None)
+
+    def sync(self, laps:List[SDAnalyzer]):
+        """resample only the laps without a row, drop rows of laps that are gone"""
+        laps = [lap for lap in laps if lap is not self.reference]
+        for lap in list(self.rows):
+            if lap not in laps:
+                del self.rows[lap]
+        for lap in laps:
+            if lap not in self.rows:
+                self.rows[lap] = self.resample(lap)
+
+    def laps(self) -> List[SDAnalyzer]:
+        return list(self.rows)
+
+    def matrix(self):
+        """len(laps) x len(grid)"""
+        if not self.rows:
+            return np.zeros((0, len(self.grid)))
+        return np.vstack(list(self.rows.values()))
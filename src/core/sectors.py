@@ -0,0 +1,94 @@
+import json
+import os
+
+import numpy as np
+
+def cumulative_time(distances, speeds):
+    """
+    time (s) from the first row to each row, integrated over distance as dx / mean speed;
+    segments with a non-positive speed at either end count as 0 (same as the rectangle Δt before)
+    """
+    d = np.asarray(distances, dtype=np.float64)
+    v = np.asarray(speeds, dtype=np.float64) * 1000 / 3600
+    if len(d) == 0:
+        return np.zeros(0)
+    v = np.where(v <= 0, np.nan, v)
+    dt = np.diff(d) / ((v[:-1] + v[1:]) / 2)
+    return np.concatenate(([0.0], np.cumsum(np.nan_to_num(dt, nan=0.0))))
+
+class SectorTimer():
+    """elapsed time between any two distances: two binary searches into the cumulative time, interpolated"""
+    def __init__(self, distances, speeds):
+        d = np.asarray(distances, dtype=np.float64)
+        cum = cumulative_time(d, speeds)
+        valid = ~np.isnan(d)
+        # 停车时距离重复，取第一行（这些行的累计时间相同）
+        self.keys, first = np.unique(d[valid], return_index=True)
+        self.cum_time = cum[valid][first]
+
+    def time_at(self, distances):
+        if len(self.keys) == 0:
+            return np.full(np.shape(distances), np.nan)
+        return np.interp(distances, self.keys, self.cum_time)
+
+    def covers(self, start, end):
+        """True where [start, end] lies inside the data (arrays allowed)"""
+        if len(self.keys) == 0:
+            return np.zeros(np.shape(start), dtype=bool) | np.zeros(np.shape(end), dtype=bool)
+        return (np.minimum(start, end) >= self.keys[0]) & (np.maximum(start, end) <= self.keys[-1])
+
+    def elapsed(self, start, end):
+        """time from start to end (arrays allowed), NaN where the data does not cover the whole span"""
+        start = np.asarray(start, dtype=np.float64)
+        end = np.asarray(end, dtype=np.float64)
+        # 不夹到端点：没跑完这一段的圈不能算出一个偏短的时间
+        return np.where(self.covers(start, end), self.time_at(end) - self.time_at(start), np.nan)[()]
+
+class Sector():
+    def __init__(self, name, start, end):
+        self.name = name
+        self.start = float(min(start, end))
+        self.end = float(max(start, end))
+
+class SectorList():
+    """named sectors, saved as json"""
+    def __init__(self, sectors = None):
+        self.sectors = list(sectors) if sectors is not None else []
+
+    def __len__(self):
+        return len(self.sectors)
+
+    def __iter__(self):
+        return iter(self.sectors)
+
+    def add(self, name, start, end):
+        """a sector with the same name is replaced"""
+        self.remove(name)
+        self.sectors.append(Sector(name, start, end))
+        self.sectors.sort(key=lambda s: s.start)
+
+    def remove(self, name):
+        self.sectors = [s for s in self.sectors if s.name != name]
+
+    def bounds(self):
+        starts = np.array([s.start for s in self.sectors], dtype=np.float64)
+        ends = np.array([s.end for s in self.sectors], dtype=np.float64)
+        return starts, ends
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([{"name": s.name, "start": s.start, "end": s.end} for s in self.sectors], f, ensure_ascii=False, indent=1)
+
+    @staticmethod
+    def load(path):
+        if not os.path.exists(path):
+            return SectorList()
+        with open(path, "r", encoding="utf-8") as f:
+            return SectorList(Sector(s["name"], s["start"], s["end"]) for s in json.load(f))
+
+def sector_table(laps, sectors:SectorList):
+    """len(laps) x len(sectors) times, NaN where a lap does not cover a sector; laps are anything with elapsed_time(starts, ends)"""
+    starts, ends = sectors.bounds()
+    if len(laps) == 0:
+        return np.zeros((0, len(starts)))
+    return np.vstack([lap.elapsed_time(starts, ends) for lap in laps])
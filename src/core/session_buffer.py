@@ -0,0 +1,189 @@
+import numbers
+
+import numpy as np
+import pandas as pd
+
+from core.kinematics import integrate_distance, get_accel
+
+CSV_COLUMNS = ["frame", "speed", "distance", "time", "accel"]
+
+_DTYPES = {
+    "frame": np.int64,
+    "speed": np.float64,
+    "distance": np.float64,
+    "time": np.float64,
+    "accel": np.float64,
+    "confidence": np.float32,
+    "interpolated": np.bool_,
+}
+
+class CsvChunkWriter():
+    """appends rows to a csv chunk by chunk, same format as DataFrame.to_csv(index=False, encoding="utf-8-sig")"""
+    def __init__(self, path, with_interpolated = False):
+        self.path = path
+        self.with_interpolated = with_interpolated
+        self._file = open(path, "w", encoding="utf-8-sig", newline="")
+        self._header = True
+
+    def write(self, columns:dict, int_speed = False):
+        data = {name: columns[name] for name in CSV_COLUMNS}
+        if int_speed:
+            data["speed"] = data["speed"].astype(np.int64)
+        if self.with_interpolated:
+            data["interpolated"] = columns["interpolated"]
+        pd.DataFrame(data).to_csv(self._file, index=False, header=self._header)
+        self._header = False
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class SessionBuffer():
+    """
+    预分配的列式读数缓存（按需倍增），代替 (time, speed, frame) 元组列表。
+    distance 按块积分，accel 在后面 window 行到齐后按块确定，
+    挂上 CsvChunkWriter 时确定的行会随提取进度分块写出
+    """
+    def __init__(self, window = 5, capacity = 4096, chunk_size = 4096, keep_all = True):
+        self.window = window
+        self.chunk_size = chunk_size
+        # keep_all=False 时已写出的行会被丢弃，只保留计算需要的上下文（纯流式）
+        self.keep_all = keep_all
+        self._cols = {name: np.empty(capacity, dtype) for name, dtype in _DTYPES.items()}
+        self.n = 0
+        self.base = 0           # 第 0 行的全局序号（丢弃已写出的行后 > 0）
+        self.dist_done = 0
+        self.accel_done = 0     # accel 已确定（不再受后续数据影响）的行数
+        self.written = 0
+        self.int_speed = True
+        self.writer: CsvChunkWriter = None
+
+    def __len__(self):
+        return self.base + self.n
+
+    def _grow(self):
+        for name, col in self._cols.items():
+            new_col = np.empty(max(16, len(col) * 2), col.dtype)
+            new_col[:self.n] = col[:self.n]
+            self._cols[name] = new_col
+
+    def append(self, time, speed, frame, interpolated = False, confidence = 1.0):
+        if self.n == len(self._cols["time"]):
+            self._grow()
+        if not isinstance(speed, numbers.Integral):
+            self.int_speed = False
+        i = self.n
+        cols = self._cols
+        cols["time"][i] = time
+        cols["speed"][i] = speed
+        cols["frame"][i] = frame
+        cols["interpolated"][i] = interpolated
+        cols["confidence"][i] = confidence
+        self.n += 1
+        if self.n - self.accel_done >= self.chunk_size + self.window:
+            self._advance()
+
+    def _integrate(self):
+        """trapezoid distance for the rows appended since the last call"""
+        s, e = self.dist_done, self.n
+        if s == e:
+            return
+        t = self._cols["time"]
+        v = self._cols["speed"]
+        d = self._cols["distance"]
+        if s == 0:
+            d[0] = 0.0
+            s = 1
+        if s < e:
+            d[s - 1:e] = integrate_distance(t[s - 1:e], v[s - 1:e], d[s - 1])
+        self.dist_done = self.n
+
+    def _accel_range(self, s, e, at_end):
+        """accel for rows [s, e); windows are clipped at the buffer end only when at_end"""
+        # 丢弃已写出的行时至少保留了 window 行上下文，所以这里只会在全局开头被截断
+        lo = max(0, s - self.window)
+        hi = self.n if at_end else min(self.n, e + self.window)
+        acc = get_accel(self._cols["speed"][lo:hi], self._cols["distance"][lo:hi], self.window)
+        self._cols["accel"][s:e] = np.asarray(acc)[s - lo:e - lo]
+
+    def _advance(self):
+        self._integrate()
+        final = self.n - self.window
+        if final > self.accel_done:
+            self._accel_range(self.accel_done, final, False)
+            self.accel_done = final
+        self._write(self.accel_done)
+
+    def _write(self, upto):
+        if self.writer is None or upto <= self.written:
+            return
+        self.writer.write(self.columns(self.written, upto), self.int_speed)
+        self.written = upto
+        if not self.keep_all:
+            self._compact()
+
+    def _compact(self):
+        """drop written rows, keeping `window` rows of context for accel and distance"""
+        drop = min(self.written, self.accel_done - self.window)
+        if drop <= 0:
+            return
+        for col in self._cols.values():
+            col[:self.n - drop] = col[drop:self.n]
+        self.n -= drop
+        self.base += drop
+        self.dist_done -= drop
+        self.accel_done -= drop
+        self.written -= drop
+
+    def finalize(self):
+        """fill distance and the provisional accel of the last rows, appending more rows later is still allowed"""
+        self._advance()
+        if self.accel_done < self.n:
+            self._accel_range(self.accel_done, self.n, True)
+
+    def columns(self, s = 0, e = None):
+        if e is None:
+            e = self.n
+        return {name: col[s:e] for name, col in self._cols.items()}
+
+    def readings(self):
+        """(frame, speed, interpolated, confidence) tuples, speed keeps int type for integer readings"""
+        cols = self.columns()
+        speeds = cols["speed"].astype(np.int64) if self.int_speed else cols["speed"]
+        return list(zip(cols["frame"].tolist(), speeds.tolist(),
+                        cols["interpolated"].tolist(), cols["confidence"].tolist()))
+
+    def to_dataframe(self, with_interpolated = None):
+        self.finalize()
+        cols = self.columns()
+        data = {name: cols[name].copy() for name in CSV_COLUMNS}
+        if self.int_speed:
+            data["speed"] = data["speed"].astype(np.int64)
+        if with_interpolated is None:
+            with_interpolated = bool(cols["interpolated"].any())
+        if with_interpolated:
+            data["interpolated"] = cols["interpolated"].copy()
+        return pd.DataFrame(data)
+
+    def attach_writer(self, writer:CsvChunkWriter):
+        """rows are written as soon as their accel is final"""
+        self.writer = writer
+        self.written = 0
+        self._advance()
+
+    def finish_writer(self):
+        self.finalize()
+        self._write(self.n)
+        self.writer.close()
+        self.writer = None
+
+    def write_csv(self, path, with_interpolated = None):
+        """write everything in chunks without building one big DataFrame"""
+        self.finalize()
+        if with_interpolated is None:
+            with_interpolated = bool(self._cols["interpolated"][:self.n].any())
+        writer = CsvChunkWriter(path, with_interpolated)
+        for s in range(0, self.n, self.chunk_size):
+            writer.write(self.columns(s, min(self.n, s + self.chunk_size)), self.int_speed)
+        writer.close()
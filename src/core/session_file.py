@@ -0,0 +1,52 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+SESSION_VERSION = 1
+SESSION_EXT = ".npz"
+# json 头存在这个键里（uint8 数组），读取时不需要 pickle
+META_KEY = "__meta__"
+
+def session_path_for(video_path):
+    name, _ = os.path.splitext(os.path.basename(video_path))
+    return os.path.join(os.path.dirname(video_path), f"{name}_database{SESSION_EXT}")
+
+def is_session_file(path):
+    return os.path.splitext(path)[1].lower() == SESSION_EXT
+
+def save_session(path, df: pd.DataFrame, meta: dict = None):
+    """
+    typed columns + json header (video, roi, fps, distance_offset ...) in an uncompressed .npz.
+    only numeric/bool columns are stored
+    """
+    meta = dict(meta or {})
+    arrays = {}
+    for name in df.columns:
+        col = df[name].to_numpy()
+        if col.dtype == object:
+            raise ValueError(f"column {name!r} is not numeric, cannot be stored in a session file")
+        arrays[str(name)] = np.ascontiguousarray(col)
+    meta["version"] = SESSION_VERSION
+    meta["columns"] = list(arrays)
+    arrays[META_KEY] = np.frombuffer(json.dumps(meta, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+    # np.savez 会自动补 .npz 后缀，直接写文件对象保持路径不变
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+def _read_meta(npz):
+    return json.loads(npz[META_KEY].tobytes().decode("utf-8"))
+
+def read_session_meta(path):
+    with np.load(path, allow_pickle=False) as npz:
+        return _read_meta(npz)
+
+def load_session(path):
+    """returns (DataFrame, meta)"""
+    with np.load(path, allow_pickle=False) as npz:
+        meta = _read_meta(npz)
+        if meta.get("version", 0) > SESSION_VERSION:
+            raise ValueError(f"{path}: session version {meta['version']} is newer than {SESSION_VERSION}")
+        df = pd.DataFrame({name: npz[name] for name in meta["columns"]})
+    return df, meta
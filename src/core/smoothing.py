@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from core.kinematics import get_accel
+
+SPEED_FILTERS = ["none", "savgol", "median"]
+
+class SmoothingConfig():
+    """
+    speed_filter 作用在速度上，accel 总是对（滤波后的）速度做 accel_window 的滑动最小二乘斜率
+    """
+    def __init__(self, speed_filter = "none", speed_window = 11, polyorder = 2, accel_window = 5):
+        if speed_filter not in SPEED_FILTERS:
+            raise ValueError(f"unknown speed filter {speed_filter!r}, expected one of {SPEED_FILTERS}")
+        self.speed_filter = speed_filter
+        self.speed_window = speed_window
+        self.polyorder = polyorder
+        self.accel_window = accel_window
+
+def _odd_window(window, n):
+    window = min(window, n if n % 2 == 1 else n - 1)
+    return window if window % 2 == 1 else window - 1
+
+def savgol_speed(speeds, window = 11, polyorder = 2):
+    from scipy.signal import savgol_filter
+    speeds = np.asarray(speeds, dtype=np.float64)
+    window = _odd_window(window, len(speeds))
+    if window <= polyorder:
+        return speeds.copy()
+    return savgol_filter(speeds, window, polyorder, mode="interp")
+
+def median_speed(speeds, window = 11):
+    speeds = pd.Series(np.asarray(speeds, dtype=np.float64))
+    return speeds.rolling(window, center=True, min_periods=1).median().to_numpy()
+
+def smooth_speed(speeds, config:SmoothingConfig):
+    if config.speed_filter == "savgol":
+        return savgol_speed(speeds, config.speed_window, config.polyorder)
+    if config.speed_filter == "median":
+        return median_speed(speeds, config.speed_window)
+    return np.asarray(speeds, dtype=np.float64).copy()
+
+def compute_channels(distance, speeds, config:SmoothingConfig = None, accel = None):
+    """
+    returns (speed, accel) arrays for plotting and hover.
+    a precomputed accel column is reused when it matches the configuration (no filter, default window)
+    """
+    if config is None:
+        config = SmoothingConfig()
+    speed = smooth_speed(speeds, config)
+    if accel is not None and config.speed_filter == "none" and config.accel_window == 5:
+        return speed, np.asarray(accel, dtype=np.float64).copy()
+    return speed, get_accel(speed, distance, config.accel_window)
@@ -0,0 +1,119 @@
+import ctypes
+import ctypes.util
+import os
+import threading
+
+import numpy as np
+
+OEM_DEFAULT = 3
+PSM_SINGLE_BLOCK = 6
+
+_LIB_NAMES = ["tesseract", "libtesseract-5", "libtesseract-4", "libtesseract"]
+
+def load_libtesseract():
+    """find libtesseract (TESSERACT_LIB overrides), None if not installed"""
+    candidates = []
+    if os.environ.get("TESSERACT_LIB"):
+        candidates.append(os.environ["TESSERACT_LIB"])
+    for name in _LIB_NAMES:
+        path = ctypes.util.find_library(name)
+        if path:
+            candidates.append(path)
+    candidates += ["libtesseract.so.5", "libtesseract.so.4", "libtesseract.dylib",
+                   r"C:\Program Files\Tesseract-OCR\libtesseract-5.dll"]
+
+    for path in candidates:
+        try:
+            lib = ctypes.CDLL(path)
+        except OSError:
+            continue
+        _declare(lib)
+        return lib
+    return None
+
+def _declare(lib):
+    p = ctypes.c_void_p
+    lib.TessBaseAPICreate.restype = p
+    lib.TessBaseAPIInit1.argtypes = [p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int,
+                                     ctypes.POINTER(ctypes.c_char_p), ctypes.c_int]
+    lib.TessBaseAPIInit1.restype = ctypes.c_int
+    lib.TessBaseAPISetPageSegMode.argtypes = [p, ctypes.c_int]
+    lib.TessBaseAPISetSourceResolution.argtypes = [p, ctypes.c_int]
+    lib.TessBaseAPISetImage.argtypes = [p, ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int]
+    # 返回 void* 以便之后用 TessDeleteText 释放
+    lib.TessBaseAPIGetUTF8Text.argtypes = [p]
+    lib.TessBaseAPIGetUTF8Text.restype = p
+    lib.TessDeleteText.argtypes = [p]
+    lib.TessBaseAPIMeanTextConf.argtypes = [p]
+    lib.TessBaseAPIMeanTextConf.restype = ctypes.c_int
+    lib.TessBaseAPIClear.argtypes = [p]
+    lib.TessBaseAPIEnd.argtypes = [p]
+    lib.TessBaseAPIDelete.argtypes = [p]
+
+class TesseractEngine():
+    """
+    常驻的 tesseract（C API），配置只加载一次，直接喂 numpy 数据，不写临时文件。
+    TessBaseAPI 不是线程安全的，每个线程/进程用自己的实例（见 get_tess_engine）
+    """
+    def __init__(self, lib, lang = "eng", configs = ("digits",), psm = PSM_SINGLE_BLOCK, datapath = None):
+        self.lib = lib
+        self.api = lib.TessBaseAPICreate()
+
+        config_arr = (ctypes.c_char_p * len(configs))(*[c.encode() for c in configs])
+        ret = lib.TessBaseAPIInit1(self.api, datapath.encode() if datapath else None, lang.encode(),
+                                   OEM_DEFAULT, config_arr, len(configs))
+        if ret != 0:
+            lib.TessBaseAPIDelete(self.api)
+            self.api = None
+            raise RuntimeError(f"tesseract init failed for language '{lang}'")
+        lib.TessBaseAPISetPageSegMode(self.api, psm)
+
+    def read(self, display_frame):
+        """returns (raw text, mean confidence 0~100)"""
+        img = np.ascontiguousarray(display_frame, dtype=np.uint8)
+        h, w = img.shape[:2]
+        bpp = 1 if img.ndim == 2 else img.shape[2]
+
+        self.lib.TessBaseAPISetImage(self.api, img.ctypes.data, w, h, bpp, img.strides[0])
+        # 与命令行读取无 DPI 的临时图片时一致
+        self.lib.TessBaseAPISetSourceResolution(self.api, 70)
+        ptr = self.lib.TessBaseAPIGetUTF8Text(self.api)
+        if not ptr:
+            return "", 0.0
+        text = ctypes.string_at(ptr).decode("utf-8", errors="ignore")
+        self.lib.TessDeleteText(ptr)
+        confidence = float(self.lib.TessBaseAPIMeanTextConf(self.api))
+        self.lib.TessBaseAPIClear(self.api)
+        return text, confidence
+
+    def close(self):
+        if self.api is not None:
+            self.lib.TessBaseAPIEnd(self.api)
+            self.lib.TessBaseAPIDelete(self.api)
+            self.api = None
+
+    def __del__(self):
+        self.close()
+
+_lib = None
+_lib_loaded = False
+_local = threading.local()
+
+def get_tess_engine():
+    """per-thread engine, None when libtesseract is unavailable (callers fall back to pytesseract)"""
+    global _lib, _lib_loaded
+    if not _lib_loaded:
+        _lib = load_libtesseract()
+        _lib_loaded = True
+    if _lib is None:
+        return None
+
+    engine = getattr(_local, "engine", None)
+    if engine is None:
+        try:
+            engine = TesseractEngine(_lib)
+        except RuntimeError:
+            _lib = None
+            return None
+        _local.engine = engine
+    return engine
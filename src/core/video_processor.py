@@ -1,25 +1,36 @@
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
-import easyocr
-import csv
 import pytesseract
 import re
 import math
 import pandas as pd
+from core.glyph_ocr import GlyphDigitRecognizer
+from core.tess_engine import get_tess_engine
+from core.journal import ExtractionJournal, read_journal_records, INTERPOLATED_CONFIDENCE
+from core.session_buffer import SessionBuffer, CsvChunkWriter
+from core.session_file import save_session
+from core.kinematics import get_accel, integrate_distance, patch_kinematics
 
 reader = None
+# 分析机器只有 CPU
+EASYOCR_GPU = False
 
 easy_err_number = [140.0, 151.0, 165.0, 244.0, 247.0]
 # 24 -> 244, 247 -> 2417
 # easy_err_number = [65, 75, 85, 95, 105, 115, 125, 135, 145, 150, 155, 165, 168, 175, 180, 185, 189, 205, 250, 255, 270, 280, 290]
 
-def get_number(display_frame, on_err_cb = None):
+def get_easyocr_reader(threads = None):
     global reader
     if reader is None:
-        reader = easyocr.Reader(['ch_sim'], gpu=True)
-    
-    result = reader.readtext(display_frame, allowlist = '0123456789')
+        # easyocr 会拉起 torch，只在真正用到时再导入
+        import easyocr
+        if threads is not None:
+            import torch
+            torch.set_num_threads(threads)
+        reader = easyocr.Reader(['ch_sim'], gpu=EASYOCR_GPU)
+    return reader
+
+def parse_easyocr_result(result, on_err_cb = None):
     if len(result) < 1:
         if on_err_cb is not None:
             on_err_cb()
@@ -36,9 +47,36 @@ def get_number(display_frame, on_err_cb = None):
 
     return number
 
+def get_number(display_frame, on_err_cb = None):
+    result = get_easyocr_reader().readtext(display_frame, allowlist = '0123456789')
+    return parse_easyocr_result(result, on_err_cb)
+
+def get_numbers_batch(display_frames, on_err_cb = None, threads = None):
+    """
+    read several ROI crops with one readtext_batched call, results keep the input order.
+    only the text detection (CRAFT) runs as one batch; recognition still goes box by box, same as
+    readtext, so the numbers match get_number. crops are resized to the shape of the first one,
+    on_err_cb(i) gets the position of every crop that could not be read
+    """
+    if len(display_frames) == 0:
+        return []
+    h, w = display_frames[0].shape[:2]
+    frames = [f if f.shape[:2] == (h, w) else cv2.resize(f, (w, h)) for f in display_frames]
+    results = get_easyocr_reader(threads).readtext_batched(
+        frames, n_width=w, n_height=h, batch_size=len(frames), allowlist='0123456789'
+    )
+    return [
+        parse_easyocr_result(r, (lambda i=i: on_err_cb(i)) if on_err_cb is not None else None)
+        for i, r in enumerate(results)
+    ]
+
 def get_number_float(display_frame, on_err_cb = None):
-    custom_config = r'--oem 3 --psm 6 outputbase digits'
-    text = pytesseract.image_to_string(display_frame, config=custom_config)
+    engine = get_tess_engine()
+    if engine is not None:
+        text, _ = engine.read(display_frame)
+    else:
+        custom_config = r'--oem 3 --psm 6 outputbase digits'
+        text = pytesseract.image_to_string(display_frame, config=custom_config)
     clean_text = re.sub(r'[^0-9.]', '', text)
     value = 0.0
     
@@ -51,92 +89,283 @@ def get_number_float(display_frame, on_err_cb = None):
         
     return value
 
-def local_slope(x_arr, y_arr, idx, window=5):
-    n = len(x_arr)
-    i0 = max(0, idx - window)
-    i1 = min(n - 1, idx + window)
-    xs = x_arr[i0:i1+1]
-    ys = y_arr[i0:i1+1]
-    if len(xs) < 2:
-        return 0.0
-    A = np.vstack([xs, np.ones_like(xs)]).T
-    slope, _ = np.linalg.lstsq(A, ys, rcond=None)[0]
-    return slope
-
-def get_accel(speeds:list, distance:list, window = 5):
-    res = []
-    for i in range(len(speeds)):
-        dv_dx = local_slope(distance, speeds, i, window=window)
-        v0 = speeds[i]
-        a = v0 * dv_dx * 25 / 324
-        res.append(a)
-    return res
-
-def regen_df_by_time_speed(df: pd.DataFrame):
+def read_number_text(display_frame):
+    """returns (digits text, mean confidence 0~100) from tesseract"""
+    engine = get_tess_engine()
+    if engine is not None:
+        text, confidence = engine.read(display_frame)
+        return re.sub(r'[^0-9.]', '', text), confidence
+
+    custom_config = r'--oem 3 --psm 6 outputbase digits'
+    data = pytesseract.image_to_data(display_frame, config=custom_config, output_type=pytesseract.Output.DICT)
+    words = [(re.sub(r'[^0-9.]', '', str(t)), float(c)) for t, c in zip(data["text"], data["conf"]) if str(t).strip()]
+    words = [(t, c) for t, c in words if t]
+    if not words:
+        return "", 0.0
+    return "".join(t for t, _ in words), min(c for _, c in words)
+
+def regen_df_by_time_speed(df: pd.DataFrame, snapshot = None):
+    """
+    full rebuild of distance/accel from time and speed. distance is integrated from the first row's
+    distance, so a lap shifted by an offset stays aligned, same as patch_df_by_time_speed
+    """
+    if snapshot is not None:
+        # 编辑器里改的 distance 会被重新积分覆盖，先恢复，删掉的行跳过
+        labels, _, old_distances, _ = snapshot
+        old = pd.Series(old_distances, index=labels)
+        kept = old.index.intersection(df.index)
+        df.loc[kept, "distance"] = old[kept]
     df = df.dropna(how='any')
-    distance = [0]
-    for i in range(1, len(df)):
-        t0, v0 = df["time"].iloc[i - 1], df["speed"].iloc[i - 1]
-        t1, v1 = df["time"].iloc[i], df["speed"].iloc[i]
-        v0_mps = v0 / 3.6
-        v1_mps = v1 / 3.6
-        delta_t = t1 - t0
-        s = distance[-1] + ((v0_mps + v1_mps) / 2) * delta_t
-        distance.append(s)
-    df["distance"] = distance
+    start = float(df["distance"].iloc[0]) if "distance" in df and len(df) else 0.0
+    df["distance"] = integrate_distance(df["time"].values, df["speed"].values, start)
     df["accel"] = get_accel(df["speed"].values, df["distance"].values)
     return df
 
+def snapshot_rows(df: pd.DataFrame, labels):
+    """state of the rows handed to DataEditor, for patch_df_by_time_speed after the edit"""
+    labels = list(labels)
+    return labels, df.loc[labels, "speed"].to_numpy(copy=True), df.loc[labels, "distance"].to_numpy(copy=True), len(df)
+
+def patch_df_by_time_speed(df: pd.DataFrame, snapshot, window = 5):
+    """
+    incremental regen_df_by_time_speed after only the speed/distance cells of the snapshot rows were edited.
+    returns False (df untouched) when a full rebuild is needed: rows deleted, NaN or non-numeric cells
+    """
+    labels, old_speeds, old_distances, rows = snapshot
+    if len(df) != rows or "accel" not in df or df.isna().values.any():
+        return False
+    if not all(pd.api.types.is_numeric_dtype(df[c]) for c in ("time", "speed", "distance", "accel")):
+        return False
+    positions = df.index.get_indexer(labels)
+    if (positions < 0).any():
+        return False
+
+    speeds = df["speed"].to_numpy()
+    distance = df["distance"].to_numpy(dtype=np.float64, copy=True)
+    accel = df["accel"].to_numpy(dtype=np.float64, copy=True)
+    # 编辑器里改的 distance 会被重新积分覆盖，先恢复
+    distance[positions] = old_distances
+    patch_kinematics(df["time"].to_numpy(dtype=np.float64), speeds, distance, accel, positions, old_speeds, window)
+    df["distance"] = distance
+    df["accel"] = accel
+    return True
+
+# 默认关闭（None）：每帧都 OCR，输出和不跳帧时完全一致。开启时建议用 0，只跳过逐像素相同的裁剪
+DEFAULT_CHANGE_THRESHOLD = None
+# 灰度差超过这个值才算像素变了，低于它的是压缩噪声
+CHANGE_PIXEL_TOLERANCE = 48
+
+class CropChangeDetector():
+    """
+    判断 ROI 是否和上一次 OCR 的 ROI 相同：原分辨率灰度逐像素比较，
+    灰度差超过 pixel_tolerance 的像素占比 <= threshold 视为没有变化。
+    不缩小、不二值化，ROI 留白再多，改一个数字也会有成片的像素超出容差
+    """
+    def __init__(self, threshold = 0.0, pixel_tolerance = CHANGE_PIXEL_TOLERANCE):
+        self.threshold = threshold
+        self.pixel_tolerance = pixel_tolerance
+        self.last_signature = None
+        self.checked = 0
+        self.skipped = 0
+
+    def signature(self, frame: cv2.Mat):
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame.copy()
+
+    def is_unchanged(self, frame: cv2.Mat):
+        """only crops that are reported as changed become the new reference"""
+        self.checked += 1
+        sig = self.signature(frame)
+        if self.last_signature is not None and self.last_signature.shape == sig.shape:
+            changed = np.count_nonzero(cv2.absdiff(sig, self.last_signature) > self.pixel_tolerance)
+            if changed <= self.threshold * sig.size:
+                self.skipped += 1
+                return True
+        self.last_signature = sig
+        return False
+
+    def reset(self):
+        self.last_signature = None
+        self.checked = 0
+        self.skipped = 0
+
+OCR_ENGINES = ["tesseract", "glyph", "easyocr"]
+EASYOCR_BATCH_SIZE = 16
+
+def make_ocr(engine = "tesseract"):
+    """returns ocr(frame, on_err_cb) -> float"""
+    if engine == "tesseract":
+        return get_number_float
+    if engine == "glyph":
+        return GlyphDigitRecognizer(read_number_text).read
+    if engine == "easyocr":
+        return get_number
+    raise ValueError(f"unknown OCR engine: {engine}")
+
+def make_batch_ocr(engine, threads = None):
+    """returns ocr_batch(frames) -> [(number, ok)], None if the engine has no batched path"""
+    if engine == "easyocr":
+        def ocr_batch(frames):
+            failed = set()
+            numbers = get_numbers_batch(frames, failed.add, threads)
+            return [(n, i not in failed) for i, n in enumerate(numbers)]
+        return ocr_batch
+    return None
+
 class TimeSpeedProcessor():
     """docstring for TimeSpeed."""
-    def __init__(self, frame_rate):
+    def __init__(self, frame_rate, change_threshold = None, engine = "tesseract", batch_size = None, ocr_threads = None):
         self.index = 0
+        self.frame_rate = frame_rate
         self.time_interval = 1.0 / frame_rate
-        self.time_speed = []
+        # 每帧一行：frame, time, speed, distance, accel, confidence（1.0 识别成功，0.0 失败）,
+        # interpolated（采样模式下未 OCR、由前后读数插值得到的帧）
+        self.readings = SessionBuffer()
+        self.last_confidence = 1.0
+        self.journal: ExtractionJournal = None
         self.ez_ocr_able_to_process = True
         self.last_speed = -1
         self.df = None
+        # change_threshold 为 None 时每帧都 OCR
+        self.change_detector = CropChangeDetector(change_threshold) if change_threshold is not None else None
+        self.ocr_calls = 0
+        self.engine = engine
+        self.ocr = make_ocr(engine)
+        self.ocr_threads = ocr_threads
+        self.ocr_batch = make_batch_ocr(engine, ocr_threads)
+        if batch_size is None:
+            batch_size = EASYOCR_BATCH_SIZE if self.ocr_batch is not None else 1
+        # 每次交给 process_frames 的帧数，1 表示逐帧处理
+        self.batch_size = batch_size if self.ocr_batch is not None else 1
         
     def process_frame(self, frame: cv2.Mat, frame_index = -1):
-        number = get_number_float(frame, None)
-        print(number)
-        self.time_speed.append((self.index * self.time_interval, number, frame_index))
-        self.index += 1
+        if self.change_detector is not None and self.change_detector.is_unchanged(frame):
+            number = self.last_speed
+        else:
+            failed = []
+            number = self.ocr(frame, lambda: failed.append(True))
+            self.last_confidence = 0.0 if failed else 1.0
+            self.ocr_calls += 1
+            print(number)
+        self.last_speed = number
+        self.append_reading(number, frame_index)
         return number
+
+    def worker_kwargs(self):
+        """constructor options for an equivalent processor in another process"""
+        return {
+            "change_threshold": self.change_detector.threshold if self.change_detector is not None else None,
+            "engine": self.engine,
+            "batch_size": self.batch_size,
+            "ocr_threads": self.ocr_threads,
+        }
+
+    def skipped_frames(self):
+        if self.change_detector is None:
+            return 0
+        return self.change_detector.skipped
+
+    def process_frames(self, frames, frame_indices):
+        """batched process_frame, unchanged crops are still skipped before the batch is built"""
+        if self.ocr_batch is None:
+            return [self.process_frame(f, i) for f, i in zip(frames, frame_indices)]
+
+        changed = [
+            self.change_detector is None or not self.change_detector.is_unchanged(f)
+            for f in frames
+        ]
+        batch_numbers = iter(self.ocr_batch([f for f, c in zip(frames, changed) if c]))
+
+        numbers = []
+        for is_changed, frame_index in zip(changed, frame_indices):
+            if is_changed:
+                self.last_speed, ok = next(batch_numbers)
+                self.last_confidence = 1.0 if ok else 0.0
+                self.ocr_calls += 1
+            numbers.append(self.last_speed)
+            self.append_reading(self.last_speed, frame_index)
+        return numbers
+
+    def append_reading(self, number, frame_index = -1, interpolated = False, confidence = None):
+        """record an already recognized number as the next sample"""
+        if confidence is None:
+            confidence = self.last_confidence
+        t = self.index * self.time_interval
+        self.readings.append(t, number, frame_index, interpolated, confidence)
+        self.index += 1
+        if self.journal is not None:
+            self.journal.append(frame_index, t, number, INTERPOLATED_CONFIDENCE if interpolated else confidence)
+
+    def attach_journal(self, journal:ExtractionJournal, resume = True):
+        """
+        journal every reading from now on. with resume, readings already journaled for the
+        same video and ROI are loaded back; returns the next frame index to extract, None if nothing was resumed
+        """
+        if self.journal is not None and self.journal is not journal:
+            self.journal.close()
+        self.journal = None
+        resumed = journal.open(resume)
+        next_frame = None
+        if resumed:
+            self.restart()
+            for frame_index, _, speed, confidence in journal.records():
+                interpolated = confidence == INTERPOLATED_CONFIDENCE
+                self.append_reading(speed, frame_index, interpolated, 0.0 if interpolated else confidence)
+                self.last_speed = speed
+                next_frame = frame_index + 1
+        self.journal = journal
+        return next_frame
             
     def get_df_data(self):
-        distance = [0]  # 初始距离为0
-        for i in range(1, len(self.time_speed)):
-            t0, v0, _ = self.time_speed[i - 1]
-            t1, v1, _ = self.time_speed[i]
-            v0_mps = v0 / 3.6
-            v1_mps = v1 / 3.6
-            delta_t = t1 - t0
-            s = distance[-1] + ((v0_mps + v1_mps) / 2) * delta_t
-            distance.append(s)
-
-        data = {
-            "frame": [self.time_speed[i][2] for i in range(len(self.time_speed))],
-            "speed": [self.time_speed[i][1] for i in range(len(self.time_speed))],
-            "distance": distance,
-            "time": [self.time_speed[i][0] for i in range(len(self.time_speed))],
-            "accel": get_accel([self.time_speed[i][1] for i in range(len(self.time_speed))], distance)
-        }
-        
-        self.df = pd.DataFrame(data)
+        self.df = self.readings.to_dataframe()
         return self.df
+
+    def stream_csv(self, name, with_interpolated = False):
+        """write rows to name while extracting, as soon as their accel no longer changes"""
+        self.readings.attach_writer(CsvChunkWriter(name, with_interpolated))
+
+    def finish_csv(self):
+        self.readings.finish_writer()
     
     def write_csv(self, name="speed_distance.csv"):
-        if self.df is None:
-            self.get_df_data()
-        
-        self.df.to_csv(name, index=False, encoding="utf-8-sig")
+        if self.journal is not None:
+            # 从日志流式生成，不再从内存列表重建
+            write_csv_from_journal(self.journal, name)
+            return
+
+        self.readings.write_csv(name)
+
+    def write_session(self, name, meta = None):
+        """binary session file (core.session_file), fps and the journal's video/ROI go into its header"""
+        header = {"fps": self.frame_rate}
+        if self.journal is not None:
+            header["video"] = self.journal.header["video"]
+            header["roi"] = self.journal.header["roi"]
+        header.update(meta or {})
+        save_session(name, self.get_df_data(), header)
             
     def restart(self):
         self.index = 0
         self.ez_ocr_able_to_process = True
-        self.time_speed.clear()
+        self.readings = SessionBuffer()
+        self.last_confidence = 1.0
+        if self.journal is not None:
+            self.journal.reset()
+        self.last_speed = -1
+        self.ocr_calls = 0
+        if self.change_detector is not None:
+            self.change_detector.reset()
         
     def get_result(self):
-        return self.time_speed
+        return self.readings
     
+
+def write_csv_from_journal(journal:ExtractionJournal, name):
+    """stream the journal into the same csv as TimeSpeedProcessor.write_csv, only a few chunks are kept in memory"""
+    journal.flush()
+    has_interpolated = any(r[3] == INTERPOLATED_CONFIDENCE for r in read_journal_records(journal.path))
+
+    buffer = SessionBuffer(keep_all=False)
+    buffer.attach_writer(CsvChunkWriter(name, has_interpolated))
+    for frame_index, t, speed, confidence in read_journal_records(journal.path):
+        buffer.append(t, speed, frame_index, confidence == INTERPOLATED_CONFIDENCE, confidence)
+    buffer.finish_writer()
@@ -1,19 +1,22 @@
 import cv2
-from PyQt5.QtWidgets import *
-from PyQt5.QtGui import QImage, QPixmap
-from PyQt5.QtCore import QTimer, Qt
+import json
 
 class VideoWrapper():
     def __init__(self,video_path:str):
         self._video_path = video_path
         self.cap = cv2.VideoCapture(video_path)
+        self._eof = False
         
     def copy(self):
         return VideoWrapper(self._video_path)
 
+    def get_video_path(self):
+        return self._video_path
+
     def set_frame(self, frame_index:int):
-        if self.cap.get(cv2.CAP_PROP_FRAME_COUNT) > frame_index:
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        """seek, past the last frame get_next_frame()/grab() return nothing instead of reading from the old position"""
+        # 帧数信息可能偏少，不按 frame count 截断，直接 seek，失败就当作到了末尾
+        self._eof = not self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
 
     def set_and_get_frame(self, frame_index:int):
         if self.cap.get(cv2.CAP_PROP_FRAME_COUNT) > frame_index:
@@ -23,10 +26,14 @@ class VideoWrapper():
         return None
     
     def get_next_frame(self):
-        if not self.cap.isOpened():
+        if self._eof or not self.cap.isOpened():
             return None
-        _, frame = self.cap.read()
-        return frame
+        ok, frame = self.cap.read()
+        return frame if ok else None
+
+    def grab(self):
+        """advance one frame without decoding it"""
+        return not self._eof and self.cap.grab()
 
     def get_frame_rate(self):
         return self.cap.get(cv2.CAP_PROP_FPS)
@@ -36,3 +43,43 @@ class VideoWrapper():
     
     def is_opened(self):
         return self.cap.isOpened()
+
+class RoiVideo():
+    def __init__(self,video:VideoWrapper, frame_idx: int, roi:tuple):
+        self.video = video.copy()
+        self.roi = roi
+        self.frame_index = frame_idx
+        self.video.set_frame(self.frame_index)
+
+    def get_next_processed_frame(self):
+        self.frame_index = self.frame_index + 1
+        self.frame = self.video.get_next_frame()
+        if self.frame is None:
+            return None
+
+        x, y, w, h = self.roi
+        return self.frame[y:y+h, x:x+w].copy()
+    
+    def set_new_value(self, idx, roi):
+        self.frame_index = idx
+        self.video.set_frame(self.frame_index)
+        self.roi=roi
+
+    def get_cur_index(self):
+        return self.frame_index
+
+    def get_video_path(self):
+        return self.video.get_video_path()
+
+    def get_roi(self):
+        return self.roi
+
+def save_roi_file(path:str, roi:tuple, frame_index:int = 0):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"roi": [int(v) for v in roi], "frame": int(frame_index)}, f)
+
+def load_roi_file(path:str):
+    """returns (roi, frame_index)"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return tuple(data["roi"]), int(data.get("frame", 0))
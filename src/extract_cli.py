@@ -0,0 +1,136 @@
+"""
+无界面提取：视频 + ROI -> *_database.csv
+
+python3 ./src/extract_cli.py video.mp4 --roi x y w h [--start N] [--end N] [--workers N]
+python3 ./src/extract_cli.py video.mp4 --roi-file video_roi.json
+"""
+import argparse
+import os
+import sys
+import time
+
+from core.video_wrapper import VideoWrapper, load_roi_file
+from core.video_processor import TimeSpeedProcessor, DEFAULT_CHANGE_THRESHOLD, OCR_ENGINES
+from core.parallel_extract import extract_range, extract_parallel, default_worker_count
+from core.sampling import extract_range_sampled, DEFAULT_MAX_ACCEL_G
+from core.journal import ExtractionJournal, journal_path_for
+from core.session_file import SESSION_EXT
+
+def default_output_path(video_path):
+    name, _ = os.path.splitext(os.path.basename(video_path))
+    return os.path.join(os.path.dirname(video_path), name + "_database.csv")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract speed/distance data from a video without GUI")
+    parser.add_argument("video", help="input video path")
+    roi_group = parser.add_mutually_exclusive_group(required=True)
+    roi_group.add_argument("--roi", nargs=4, type=int, metavar=("X", "Y", "W", "H"),
+                           help="speed digits region in image coordinates")
+    roi_group.add_argument("--roi-file", help="ROI json saved by the GUI")
+    parser.add_argument("--start", type=int, default=None, help="first frame (default: ROI file frame or 0)")
+    parser.add_argument("--end", type=int, default=None, help="stop before this frame (default: end of video)")
+    parser.add_argument("--workers", type=int, default=default_worker_count(), help="OCR processes, 1 = serial")
+    parser.add_argument("--change-threshold", type=float, default=DEFAULT_CHANGE_THRESHOLD,
+                        help="opt-in: reuse the last reading when at most this fraction of ROI pixels changed "
+                             "(compared at full resolution, 0 = only identical crops). default: OCR every frame")
+    parser.add_argument("--engine", choices=OCR_ENGINES, default="tesseract",
+                        help="glyph: learn digit templates from confident tesseract reads, fall back to tesseract")
+    parser.add_argument("--batch-size", type=int, default=None, help="crops per easyocr call")
+    parser.add_argument("--ocr-threads", type=int, default=None, help="torch threads per process for easyocr")
+    parser.add_argument("--sample-step", type=int, default=1,
+                        help="OCR every k-th frame and interpolate, densifying where speed jumps (1 = every frame)")
+    parser.add_argument("--max-accel", type=float, default=DEFAULT_MAX_ACCEL_G,
+                        help="plausible acceleration (g) between samples for --sample-step")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="ignore the extraction journal of a previous run with the same video and ROI")
+    parser.add_argument("-o", "--output", default=None, help="output csv (default: <video>_database.csv)")
+    parser.add_argument("--session", default=None, metavar="PATH",
+                        help=f"also write a binary session file ({SESSION_EXT}) with video, ROI and fps in its header")
+    return parser.parse_args(argv)
+
+def run(args):
+    if args.roi_file is not None:
+        roi, start = load_roi_file(args.roi_file)
+    else:
+        roi, start = tuple(args.roi), 0
+    if args.start is not None:
+        start = args.start
+
+    video = VideoWrapper(args.video)
+    if not video.is_opened():
+        print(f"cannot open video: {args.video}", file=sys.stderr)
+        return 1
+
+    change_threshold = args.change_threshold if args.change_threshold is not None and args.change_threshold >= 0 else None
+    processor = TimeSpeedProcessor(video.get_frame_rate(), change_threshold, args.engine,
+                                   args.batch_size, args.ocr_threads)
+    journal = ExtractionJournal(journal_path_for(args.video, roi), args.video, roi, processor.frame_rate)
+    next_frame = processor.attach_journal(journal, resume=not args.no_resume)
+    if next_frame is not None:
+        start = next_frame
+
+    output = args.output if args.output is not None else default_output_path(args.video)
+    # 帧数为 0 表示容器没给出帧数，只能读到 EOF 才知道
+    end = args.end if args.end is not None else int(video.get_frame_count()) or None
+    if end is not None and start >= end:
+        if next_frame is None:
+            journal.close()
+            print(f"no frame to extract in [{start}, {end}) of {args.video}", file=sys.stderr)
+            return 1
+        # 日志已经覆盖到结尾：不再提取，输出从日志重新生成
+        print(f"already complete: {len(processor.get_result())} frames journaled -> {output}")
+        processor.write_csv(output)
+        if args.session is not None:
+            processor.write_session(args.session)
+        journal.close()
+        return 0
+    if next_frame is not None:
+        print(f"resuming from frame {next_frame} ({len(processor.get_result())} frames journaled)")
+
+    # 确定有帧要提取后才打开输出；行的 accel 确定后就写出，结束时只剩最后一块
+    processor.stream_csv(output, with_interpolated=args.sample_step > 1)
+
+    begin = time.perf_counter()
+    if args.workers > 1:
+        stats = {}
+        def on_readings(readings):
+            for frame_index, number, interpolated, confidence in readings:
+                processor.append_reading(number, frame_index, interpolated, confidence)
+
+        extract_parallel(args.video, roi, start, args.end, workers=args.workers,
+                         frame_rate=processor.frame_rate,
+                         processor_kwargs=processor.worker_kwargs(), stats=stats,
+                         sample_step=args.sample_step, max_accel_g=args.max_accel,
+                         on_readings=on_readings)
+        ocr_calls, skipped = stats.get("ocr_calls", 0), stats.get("skipped", 0)
+    elif args.sample_step > 1:
+        extract_range_sampled(args.video, roi, start,
+                              args.end if args.end is not None else int(video.get_frame_count()),
+                              processor, args.sample_step, args.max_accel)
+        ocr_calls, skipped = processor.ocr_calls, processor.skipped_frames()
+    else:
+        timing = {}
+        extract_range(args.video, roi, start, args.end, processor, timing)
+        ocr_calls, skipped = processor.ocr_calls, processor.skipped_frames()
+        print("decode {decode:.1f}s, decode ahead of OCR {decode_ahead:.1f}s, "
+              "OCR waiting for decode {ocr_waiting_decode:.1f}s".format(**timing))
+
+    processor.finish_csv()
+    if len(processor.get_result()) == 0:
+        journal.close()
+        print(f"no frame extracted from {args.video}", file=sys.stderr)
+        return 1
+    if args.session is not None:
+        processor.write_session(args.session)
+    journal.close()
+
+    elapsed = time.perf_counter() - begin
+    print(f"{len(processor.get_result())} frames in {elapsed:.1f}s -> {output}")
+    print(f"OCR calls: {ocr_calls}, unchanged frames skipped: {skipped}")
+    return 0
+
+def main(argv=None):
+    return run(parse_args(argv))
+
+if __name__ == "__main__":
+    sys.exit(main())
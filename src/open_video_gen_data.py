@@ -1,7 +1,12 @@
 import sys
 from PyQt5.QtWidgets import QApplication, QMainWindow, QMessageBox, QFileDialog, QWidget, QVBoxLayout
 from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
-from core.video_processor import TimeSpeedProcessor
+from core.video_processor import TimeSpeedProcessor, DEFAULT_CHANGE_THRESHOLD
+from core.parallel_extract import extract_parallel, default_worker_count
+from core.video_wrapper import save_roi_file
+from core.prefetch import PrefetchReader
+from core.journal import ExtractionJournal, journal_path_for
+from core.session_file import session_path_for
 import os
 import copy
 from widgets.ocr_canvas import OCRCanvas, RoiVideo, VideoSlider
@@ -10,23 +15,67 @@ class VideoAnalysisThread(QThread):
     finished = pyqtSignal(object)
     processed = pyqtSignal(object)
 
-    def __init__(self, roi:RoiVideo, processr:TimeSpeedProcessor):
+    def __init__(self, roi:RoiVideo, processr:TimeSpeedProcessor, workers = 1):
         super().__init__()
         self.roi = roi
         self.running = True
         self.processor = processr
+        self.workers = workers
 
     def run(self):
-        # 模拟耗时分析
-        while self.running:
-            frame = self.roi.get_next_processed_frame()
-            
-            if frame is None:
-                self.finished.emit({"result":self.processor.get_df_data()})
-                return
+        if self.workers > 1:
+            self.run_parallel()
+            return
+
+        # 解码在 PrefetchReader 线程里提前进行，这里只做 OCR
+        reader = PrefetchReader(self.roi).start()
+        next_index = self.roi.get_cur_index()
+        try:
+            while self.running:
+                item = reader.get()
+                if item is None:
+                    self.finished.emit({"result":self.processor.get_df_data()})
+                    return
+
+                index, frame = item
+                number = self.processor.process_frame(frame, index)
+                next_index = index + 1
+                self.processed.emit({"frame": frame, "number": number, "index": index})
+        finally:
+            reader.stop()
+            if self.processor.journal is not None:
+                self.processor.journal.flush()
+        # 暂停：解码线程读在前面，回退到第一个还没 OCR 的帧
+        self.roi.set_new_value(next_index, self.roi.get_roi())
+
+    def run_parallel(self):
+        # 按帧区间切分给多个进程，结果按帧顺序合并后再交给 processor
+        def on_shard_done(i, frame_range, readings):
+            if readings:
+                frame_index, number = readings[-1][:2]
+                self.processed.emit({"frame": None, "number": number, "index": frame_index})
 
-            number = self.processor.process_frame(frame, self.roi.get_cur_index() - 1)
-            self.processed.emit({"frame": frame, "number": number, "index": self.roi.get_cur_index() - 1})
+        # 按帧顺序逐段交给 processor，便于写入日志
+        def on_readings(readings):
+            for frame_index, number, interpolated, confidence in readings:
+                self.processor.append_reading(number, frame_index, interpolated, confidence)
+
+        readings = extract_parallel(
+            self.roi.get_video_path(), self.roi.get_roi(), self.roi.get_cur_index(),
+            workers=self.workers, frame_rate=self.processor.frame_rate,
+            processor_kwargs=self.processor.worker_kwargs(),
+            on_shard_done=on_shard_done, should_stop=lambda: not self.running,
+            on_readings=on_readings
+        )
+        if self.processor.journal is not None:
+            self.processor.journal.flush()
+
+        if not self.running:
+            # 暂停：下次 start 从已合并的最后一帧之后继续
+            if readings:
+                self.roi.set_new_value(readings[-1][0] + 1, self.roi.get_roi())
+            return
+        self.finished.emit({"result":self.processor.get_df_data()})
     
     def set_new_value(self, idx, roi):
         self.roi.set_new_value(idx, roi)
@@ -67,10 +116,13 @@ class ROIWindow(QMainWindow):
         
         self.is_paused = False
         
+        self.video_path = video_path
         video_base = os.path.basename(video_path)
         name,_ = os.path.splitext(video_base)
         self.name = name
         self.save_path = os.path.join(os.path.dirname(video_path), self.name+"_database.csv")
+        self.roi_path = os.path.join(os.path.dirname(video_path), self.name+"_roi.json")
+        self.roi_start_frame = 0
         print(self.save_path)
         
         self.timer = QTimer()
@@ -79,7 +131,7 @@ class ROIWindow(QMainWindow):
 
         # self.processor = TimeSpeedProcessor(self.ocr_canvas.video_frame_rate())
         
-        self.q_thread = VideoAnalysisThread(self.ocr_canvas.get_roi_video_copy(), TimeSpeedProcessor(self.ocr_canvas.video_frame_rate()))
+        self.q_thread = VideoAnalysisThread(self.ocr_canvas.get_roi_video_copy(), TimeSpeedProcessor(self.ocr_canvas.video_frame_rate(), DEFAULT_CHANGE_THRESHOLD), default_worker_count())
         self.q_thread.processed.connect(self.play_processed_frame)
         self.q_thread.finished.connect(self.finish)
         
@@ -89,7 +141,17 @@ class ROIWindow(QMainWindow):
         self.ocr_canvas.paly_video_at_index(idx)
     
     def finish(self):
+        self.save_result()
+
+    def save_result(self):
         self.q_thread.processor.write_csv(self.save_path)
+        meta = {"video": os.path.abspath(self.video_path), "start_frame": self.roi_start_frame}
+        if self.ocr_canvas.roi is not None:
+            meta["roi"] = [int(v) for v in self.ocr_canvas.roi]
+        self.q_thread.processor.write_session(session_path_for(self.video_path), meta)
+        # 保存 ROI，供 extract_cli.py --roi-file 无界面批量处理
+        if self.ocr_canvas.roi is not None:
+            save_roi_file(self.roi_path, self.ocr_canvas.roi, self.roi_start_frame)
     
     def play_video(self):
         self.ocr_canvas.play_video()
@@ -98,7 +160,16 @@ class ROIWindow(QMainWindow):
         # roi selected:
         if self.ocr_canvas.roi_selected == True:
             self.timer.stop()
-            self.q_thread.set_new_value(self.ocr_canvas.frame_index, self.ocr_canvas.roi)
+            self.roi_start_frame = self.ocr_canvas.frame_index
+            start = self.ocr_canvas.frame_index
+            # 同一视频、同一 ROI 之前中断过：从日志里最后一帧之后继续
+            processor = self.q_thread.processor
+            journal = ExtractionJournal(journal_path_for(self.video_path, self.ocr_canvas.roi),
+                                        self.video_path, self.ocr_canvas.roi, processor.frame_rate)
+            next_frame = processor.attach_journal(journal)
+            if next_frame is not None:
+                start = next_frame
+            self.q_thread.set_new_value(start, self.ocr_canvas.roi)
             self.q_thread.start()
         
     def timer_play_or_pause(self, to_pause = None):
@@ -133,7 +204,7 @@ class ROIWindow(QMainWindow):
     def keyPressEvent(self, event):
         if event.key() == Qt.Key_S and event.modifiers() & Qt.ControlModifier:
             self.q_thread.get_result()
-            self.q_thread.processor.write_csv(self.save_path)
+            self.save_result()
             self.timer_play_or_pause(True)
             QMessageBox.information(self, "保存成功", f"文件已保存到:{self.save_path}")
             
@@ -16,8 +16,18 @@ from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import matplotlib.pyplot as plt
 
 from speed_distance_analyer import PltMainWindow
+from core.session_file import is_session_file, read_session_meta
+
+DATA_EXTS = ['.csv', '.npz']
 
 def get_video_path(csv_path):
+    # session 文件头里记录了视频路径
+    if is_session_file(csv_path):
+        video = read_session_meta(csv_path).get("video")
+        if video and os.path.isfile(video):
+            return video
+        csv_path = csv_path[:-len(".npz")] + ".csv"
+
     dir_path = os.path.dirname(csv_path)
     csv_name = os.path.basename(csv_path)
 
@@ -68,7 +78,7 @@ class PlotTab(QWidget):
                 QMessageBox.critical(self, "错误", f"拖放解析失败：{e}")
                 return
 
-        # ===== 模式 2：.csv / .mp4 配对拖放 =====
+        # ===== 模式 2：.csv(.npz) / .mp4 配对拖放 =====
         if event.mimeData().hasUrls():
             urls = event.mimeData().urls()
             if not urls:
@@ -78,13 +88,13 @@ class PlotTab(QWidget):
                 path = url.toLocalFile()
                 ext = os.path.splitext(path)[1].lower()
 
-                # 🚫 非 csv / mp4 文件直接拒绝
-                if ext not in ['.csv', '.mp4']:
+                # 🚫 非 csv / npz / mp4 文件直接拒绝
+                if ext not in DATA_EXTS + ['.mp4']:
                     QMessageBox.warning(self, "错误", f"不支持的文件类型：{ext}")
                     return
 
-                # 📄 拖入 CSV
-                if ext == '.csv':
+                # 📄 拖入 CSV 或 session
+                if ext in DATA_EXTS:
                     if self.pending_csv:
                         self.pending_csv = None
                         self.csv_locked = True
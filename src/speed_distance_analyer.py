@@ -6,12 +6,14 @@ from PyQt5.QtGui import QImage, QPixmap
 from PyQt5.QtCore import QTimer, Qt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import pandas as pd
-from scipy.signal import savgol_filter
 from widgets.figure_canvas import VisCanvas, TimeDiferenceCanvas, AccelCanvas
 from widgets.video_canvas import VideoCanvas
-from core.sd_analyzer import SDAnalyzer, get_time_differences
+from core.sd_analyzer import SDAnalyzer, LapDeltaMatrix, DEFAULT_DELTA_RESOLUTION, auto_align
+from core.smoothing import SmoothingConfig, SPEED_FILTERS
+from core.sectors import SectorList, sector_table
 from typing import List
 import os
+import html
 
 file1 = r'C:/Users/I_Rin/Desktop/Racecar-tools/distance_speed_u9x.mp4.csv'
 file2 = r'C:/Users/I_Rin/Desktop/Racecar-tools/distance_speed_su7u.mp4.csv'
@@ -37,6 +39,61 @@ class PltMainWindow(QMainWindow):
         top_layout.addStretch()
         top_layout.setAlignment(Qt.AlignRight)
         
+        # 速度曲线、加速度曲线和悬停读数所用速度的滤波方式
+        self.smoothing = SmoothingConfig()
+        top_layout.addWidget(QLabel("speed filter:"))
+        self.smoothing_box = QComboBox()
+        self.smoothing_box.addItems(SPEED_FILTERS)
+        self.smoothing_box.setFixedSize(120, 30)
+        self.smoothing_box.currentTextChanged.connect(self.set_smoothing)
+        top_layout.addWidget(self.smoothing_box)
+        
+        # 滤波窗口和加速度斜率窗口（采样点数）
+        top_layout.addWidget(QLabel("window:"))
+        self.speed_window_box = QSpinBox()
+        self.speed_window_box.setRange(3, 201)
+        self.speed_window_box.setSingleStep(2)
+        self.speed_window_box.setValue(self.smoothing.speed_window)
+        self.speed_window_box.setFixedSize(70, 30)
+        self.speed_window_box.valueChanged.connect(self.set_smoothing)
+        top_layout.addWidget(self.speed_window_box)
+        
+        top_layout.addWidget(QLabel("accel window:"))
+        self.accel_window_box = QSpinBox()
+        self.accel_window_box.setRange(1, 50)
+        self.accel_window_box.setValue(self.smoothing.accel_window)
+        self.accel_window_box.setFixedSize(70, 30)
+        self.accel_window_box.valueChanged.connect(self.set_smoothing)
+        top_layout.addWidget(self.accel_window_box)
+        
+        # 时间差和框选 Δt 的参考圈
+        top_layout.addWidget(QLabel("reference lap:"))
+        self.reference_box = QComboBox()
+        self.reference_box.setFixedSize(200, 30)
+        self.reference_box.currentIndexChanged.connect(self.set_reference)
+        top_layout.addWidget(self.reference_box)
+        
+        self.align_button = QPushButton("auto align")
+        self.align_button.clicked.connect(self.auto_align)
+        self.align_button.setFixedSize(120, 30)
+        self.align_button.setStyleSheet("font-size: 15px;")
+        top_layout.addWidget(self.align_button)
+        
+        # 命名分段：框选后保存，所有圈一起出分段时间表
+        self.sector_path = os.path.expanduser("~/racecar_sectors.json")
+        self.sectors = SectorList.load(self.sector_path)
+        self.save_sector_button = QPushButton("save sector")
+        self.save_sector_button.clicked.connect(self.save_sector)
+        self.save_sector_button.setFixedSize(120, 30)
+        self.save_sector_button.setStyleSheet("font-size: 15px;")
+        top_layout.addWidget(self.save_sector_button)
+        
+        self.sector_table_button = QPushButton("sector table")
+        self.sector_table_button.clicked.connect(self.show_sector_table)
+        self.sector_table_button.setFixedSize(120, 30)
+        self.sector_table_button.setStyleSheet("font-size: 15px;")
+        top_layout.addWidget(self.sector_table_button)
+        
         self.show_accel_button = QPushButton("show acceleration")
         self.show_accel_button.clicked.connect(self.show_accel)
         self.show_accel_button.setFixedSize(200, 30)
@@ -70,6 +127,9 @@ class PltMainWindow(QMainWindow):
         layout.addWidget(self.time_canvas, stretch=1)
         self.show_time_canvas = False
         self.time_canvas.hide()
+        # 时间差曲线的距离网格（m）
+        self.delta_resolution = DEFAULT_DELTA_RESOLUTION
+        self.lap_deltas: LapDeltaMatrix = None
 
         # ---- 下方视频区域 (自动2x2布局) ----
         self.video_container = QWidget()
@@ -95,20 +155,87 @@ class PltMainWindow(QMainWindow):
             self.accel_canvas.hide()
             self.show_accel_button.setText("show acceleration")
         
+    def set_smoothing(self, *args):
+        self.smoothing = SmoothingConfig(self.smoothing_box.currentText(), self.speed_window_box.value(),
+                                         accel_window=self.accel_window_box.value())
+        for analyzer in self.canvas.analyzers:
+            analyzer.set_smoothing(self.smoothing)
+        self.accel_canvas.refresh_lines()
+        self.canvas.draw_idle()
+        
     def keyReleaseEvent(self, event):
         if event.key() == Qt.Key.Key_Control:
             self.canvas.press_ctrl = False
     
         return super().keyReleaseEvent(event)
     
-    def update_time_data(self):
-        if self.show_time_canvas:
-            if len(self.canvas.analyzers) == 2:
-                sd1 = self.canvas.analyzers[0]
-                sd2 = self.canvas.analyzers[1]
-                data = get_time_differences(sd1, sd2)
-                self.time_canvas.add_data(data)
-                self.time_canvas.draw_idle()
+    def auto_align(self):
+        """align every lap to the reference lap by speed trace correlation"""
+        analyzers = self.canvas.analyzers
+        if len(analyzers) < 2:
+            return
+        reference = analyzers[self.canvas.reference_index]
+        for lap in analyzers:
+            if lap is reference:
+                continue
+            step = auto_align(reference, lap)
+            if step is None:
+                print(f"{lap.name}: not enough overlap with {reference.name} to align")
+                continue
+            print(f"{lap.name}: shifted {step:+.2f} m")
+            self.update_time_data(lap)
+        self.canvas.draw_idle()
+        self.accel_canvas.draw_idle()
+    
+    def save_sector(self):
+        selection = self.canvas.last_selection
+        if selection is None:
+            QMessageBox.information(self, "提示", "请先在速度图上框选一段距离。")
+            return
+        name, ok = QInputDialog.getText(self, "保存分段", f"{selection[0]:.0f}m - {selection[1]:.0f}m 分段名称：",
+                                        text=f"S{len(self.sectors) + 1}")
+        if ok and name.strip():
+            self.sectors.add(name.strip(), *selection)
+            self.sectors.save(self.sector_path)
+    
+    def show_sector_table(self):
+        if len(self.sectors) == 0 or not self.canvas.analyzers:
+            QMessageBox.information(self, "提示", "没有保存的分段。")
+            return
+        table = sector_table(self.canvas.analyzers, self.sectors)
+        # NaN：这一圈没有完整覆盖该分段，不参与最好成绩，显示为 -
+        missing = np.isnan(table)
+        best = np.full(table.shape[1], np.nan)
+        covered = ~missing.all(axis=0)
+        best[covered] = np.nanmin(table[:, covered], axis=0)
+        header = f"{'':<16}" + "".join(f"{s.name:>12}" for s in self.sectors) + f"{'total':>12}"
+        rows = [header]
+        for analyzer, times, lap_missing in zip(self.canvas.analyzers, table, missing):
+            cells = "".join(f"{'-':>11} " if np.isnan(t) else f"{t:>11.3f}{'*' if t == b else ' '}" for t, b in zip(times, best))
+            total = f"{'-':>12}" if lap_missing.all() else f"{np.nansum(times):>11.3f}{'~' if lap_missing.any() else ' '}"
+            rows.append(f"{analyzer.name[:16]:<16}{cells}{total}")
+        if missing.any():
+            rows.append("\n- 未完整覆盖该分段    ~ 合计不含未覆盖的分段")
+        QMessageBox.information(self, "分段时间 (s)", "<pre>" + html.escape("\n".join(rows)) + "</pre>")
+    
+    def set_reference(self, index):
+        if index < 0:
+            return
+        self.canvas.reference_index = index
+        self.update_time_data()
+    
+    """moved: analyzer whose distance was adjusted, only its row (or all rows if it is the reference) is resampled"""
+    def update_time_data(self, moved = None):
+        if moved is not None and self.lap_deltas is not None:
+            self.lap_deltas.invalidate(moved)
+        if not self.show_time_canvas or len(self.canvas.analyzers) < 2:
+            return
+        reference = self.canvas.analyzers[self.canvas.reference_index]
+        if self.lap_deltas is None or self.lap_deltas.reference is not reference:
+            self.lap_deltas = LapDeltaMatrix(reference, self.delta_resolution)
+        self.lap_deltas.sync(self.canvas.analyzers)
+        self.time_canvas.set_deltas(self.lap_deltas)
+        self.time_canvas.draw_idle()
     
     def keyPressEvent(self, event):
         if len(self.canvas.analyzers) == 1:
@@ -129,7 +256,8 @@ class PltMainWindow(QMainWindow):
                         return True    # 打开失败，说明文件正被占用
 
                 name = self.canvas.analyzers[0].name
-                file_path, _ = QFileDialog.getSaveFileName(self, "保存数据文件", os.path.expanduser(f"~/{name}.csv"), "CSV 文件 (*.csv)")
+                file_path, _ = QFileDialog.getSaveFileName(self, "保存数据文件", os.path.expanduser(f"~/{name}.csv"),
+                                                           "CSV 文件 (*.csv);;Session 文件 (*.npz)")
                 if file_path:
                     if is_file_in_use(file_path):
                          QMessageBox.critical(
@@ -138,8 +266,7 @@ class PltMainWindow(QMainWindow):
                             f"文件：\n{file_path}\n\n当前被其他程序占用，请关闭后再试。",
                         )
                     else:
-                        df = self.canvas.analyzers[0].df
-                        df.to_csv(file_path, index=False, encoding="utf-8-sig")
+                        self.canvas.analyzers[0].save(file_path)
                 
         step = 10
         idx = self.canvas.selected_index
@@ -148,7 +275,7 @@ class PltMainWindow(QMainWindow):
                 self.canvas.analyzers[idx].adjust_distance(-step)
             elif event.key() == Qt.Key.Key_Right:
                 self.canvas.analyzers[idx].adjust_distance(step)
-            self.update_time_data()
+            self.update_time_data(self.canvas.analyzers[idx])
             self.canvas.draw()
             
         if event.key() == Qt.Key.Key_Escape:
@@ -190,7 +317,7 @@ class PltMainWindow(QMainWindow):
             vis.inc_current_index()
 
             vis.draw_point()
-            self.canvas.update_plot()
+            self.canvas.blit_hover()
             
         self.videos[min_idx].register_frame_update_func(slowest_update_to_draw)
 
@@ -235,16 +362,17 @@ class PltMainWindow(QMainWindow):
         self.videos.append(video_canvas)
         def update_video(vis:SDAnalyzer, i:int):
             self.videos[i].update_frame(vis.get_current_frame_index())
-            self.accel_canvas.draw_idle()
-            self.canvas.draw_idle()
-            self.time_canvas.draw_idle()
+            # 只有标记点动了，blit 即可
+            self.accel_canvas.blit_hover()
+            self.canvas.blit_hover()
+            self.time_canvas.blit_hover()
             
         self.canvas.register_instance_on_hover(update_video, len(self.videos) - 1)
         self.accel_canvas.register_instance_on_hover(update_video, len(self.videos) - 1)
         self.time_canvas.register_instance_on_hover(update_video, len(self.videos) - 1)
         video_canvas.set_frame_index(initial_idx)
         
-        if len(self.canvas.analyzers) == 2:
+        if len(self.canvas.analyzers) >= 2:
             self.update_time_data()
         
         self.refresh_video_layout()
@@ -256,17 +384,21 @@ class PltMainWindow(QMainWindow):
     
     def add_instance(self, path, video_path):
         sd_instance = self.canvas.add_instance_by_file(path)
+        sd_instance.set_smoothing(self.smoothing)
         initial_idx = sd_instance.get_initial_frame()
         self.accel_canvas.add_data_by_sda(sd_instance)
         self.time_canvas.add_sda(sd_instance)
+        self.reference_box.addItem(sd_instance.name)
         self.add_video(video_path, initial_idx)
         return sd_instance
 
     def add_instance_by_data_frame(self, video_path, df):
         sd_instance = self.canvas.add_instance_by_df(video_path, df)
+        sd_instance.set_smoothing(self.smoothing)
         initial_idx = sd_instance.get_initial_frame()
         self.accel_canvas.add_data_by_sda(sd_instance)
         self.time_canvas.add_sda(sd_instance)
+        self.reference_box.addItem(sd_instance.name)
         self.add_video(video_path, initial_idx)
         return sd_instance
     
@@ -1,6 +1,6 @@
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import matplotlib.pyplot as plt
-from core.sd_analyzer import SDAnalyzer
+from core.sd_analyzer import SDAnalyzer, LapDeltaMatrix
 import mplcursors
 from typing import List
 from matplotlib.widgets import RectangleSelector
@@ -8,10 +8,15 @@ from widgets.data_editor import DataEditor
 from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
 from PyQt5.QtWidgets import QFileDialog, QWidget, QVBoxLayout
 
-from core.video_processor import regen_df_by_time_speed
+from core.video_processor import regen_df_by_time_speed, patch_df_by_time_speed, snapshot_rows
+from core.decimation import DecimatedLine
+from widgets.hover_blit import HoverBlitter
 import numpy as np
 
-colors = ["#1f77b4","#ff7f0e","#d62728","#9467bd"]
+colors = ["#1f77b4","#ff7f0e","#d62728","#9467bd","#2ca02c","#8c564b","#e377c2","#7f7f7f","#bcbd22","#17becf"]
+
+def lap_color(i):
+    return colors[i % len(colors)]
 
 class AccelCanvas(FigureCanvas):
     def __init__(self):
@@ -35,6 +40,13 @@ class AccelCanvas(FigureCanvas):
         
         self.lines = []
         self.h_line = None
+        self.blitter = HoverBlitter(self, self.hover_artists, [self.ax])
+
+    def hover_artists(self):
+        return [a.accel_point for a in self.analyzers] + [getattr(self, "_hover_anno", None)]
+
+    def blit_hover(self):
+        self.blitter.request()
         
     def register_instance_on_hover(self, func, i):
         self._analyzer_update_cb[i] = func       
@@ -42,8 +54,21 @@ class AccelCanvas(FigureCanvas):
     def add_data_by_sda(self, analyzer: SDAnalyzer):
         self.analyzers.append(analyzer)
         self._analyzer_update_cb.append(None)
-        l = self.ax.plot(analyzer.df['distance'], analyzer.df['accel'], label=analyzer.name, color=analyzer.color)
-        self.lines.append(l)
+        l, = self.ax.plot(analyzer.df['distance'], analyzer.accel_channel, label=analyzer.name, color=analyzer.color)
+        trace = DecimatedLine(l)
+        analyzer.follow_offset(trace)
+        self.lines.append(trace)
+        self.draw_idle()
+
+    def refresh_lines(self):
+        """redraw after the analyzers' channels were recomputed"""
+        for analyzer, trace in zip(self.analyzers, self.lines):
+            trace.set_data(analyzer.df['distance'], analyzer.accel_channel)
+        self.ax.relim()
+        self.ax.autoscale_view()
+        # 放大时 xlim 不变、不会触发回调，限制定下来后按当前视图重新抽稀
+        for trace in self.lines:
+            trace.refresh()
         self.draw_idle()
         
     def on_mouse_move(self, event):
@@ -71,11 +96,12 @@ class AccelCanvas(FigureCanvas):
                 ha="left", va="bottom",
                 color="white",
                 fontsize=9,
+                animated=True,
                 bbox=dict(facecolor="#4f4f4f", alpha=0.6, boxstyle="round,pad=0.3")
             )
         else:
             self._hover_anno.set_text(annotation_text)
-        self.draw_idle()
+        self.blit_hover()
 
 class TimeDiferenceCanvas(FigureCanvas):
     def __init__(self):
@@ -98,20 +124,46 @@ class TimeDiferenceCanvas(FigureCanvas):
                         fontsize=9,
                         bbox=dict(facecolor="#4f4f4f", alpha=0.6, boxstyle="round,pad=0.3"),
                         arrowprops=dict(arrowstyle="->", color="black"),
-                        ha="center"
+                        ha="center",
+                        animated=True
                     )
         self.annotation.set_visible(False)
+        self.blitter = HoverBlitter(self, lambda: [self.annotation], [self.ax])
         self.fig.canvas.mpl_connect("motion_notify_event", self.on_hover)        
-        self.line = None
+        # 每一圈（相对参考圈）一条线，画的是抽稀后的点，悬停读 trace.y 的完整数据
+        self.lines = {}
+        self.grid = np.zeros(0)
         
-    def add_data(self, df):
-        if self.line is None:
-            self.line, = self.ax.plot(df['distance'], df['time_d'], picker=5)
-            return 
-        self.line.set_data(df['distance'], df['time_d'])
+    def set_deltas(self, deltas: LapDeltaMatrix):
+        laps = deltas.laps()
+        for lap in list(self.lines):
+            if lap not in laps:
+                self.lines.pop(lap).remove()
+        for lap, row in zip(laps, deltas.matrix()):
+            label = f"{deltas.reference.name} - {lap.name}"
+            if lap not in self.lines:
+                line, = self.ax.plot(deltas.grid, row, picker=5, color=lap.color, label=label)
+                self.lines[lap] = DecimatedLine(line)
+            else:
+                self.lines[lap].set_data(deltas.grid, row)
+                # 参考圈可能换了
+                self.lines[lap].line.set_label(label)
+        self.grid = deltas.grid
+        self.ax.relim()
+        self.ax.autoscale_view()
+        # 放大时 xlim 不变、不会触发回调，限制定下来后按当前视图重新抽稀
+        for trace in self.lines.values():
+            trace.refresh()
+        if self.lines:
+            self.ax.legend()
+        elif self.ax.get_legend() is not None:
+            self.ax.get_legend().remove()
         
     def register_instance_on_hover(self, func, i):
         self._analyzer_update_cb[i] = func 
+
+    def blit_hover(self):
+        self.blitter.request()
                      
     def add_sda(self, analyzer: SDAnalyzer):
         self.analyzers.append(analyzer)
@@ -119,11 +171,11 @@ class TimeDiferenceCanvas(FigureCanvas):
         
     def on_hover(self, event):
         """当鼠标移动到曲线上方时显示提示框"""
-        if self.line is None or event.inaxes != self.ax:
+        if not self.lines or event.inaxes != self.ax:
             return
 
-        xdata, ydata = self.line.get_data()
-        if len(xdata) == 0:
+        xdata = self.grid
+        if len(xdata) < 2:
             return
 
         # 找到最近的点
@@ -146,22 +198,31 @@ class TimeDiferenceCanvas(FigureCanvas):
         else:
             idx = right
 
-        x_near, y_near = xdata[idx], ydata[idx]
+        # 所有线共用一个距离网格，取这个点上离鼠标最近的线
+        ys = np.array([trace.y[idx] for trace in self.lines.values()])
+        if np.isnan(ys).all():
+            self.annotation.set_visible(False)
+            self.blit_hover()
+            return
+        nearest = int(np.nanargmin(np.abs(ys - event.ydata)))
+        lap = list(self.lines)[nearest]
+        x_near, y_near = xdata[idx], ys[nearest]
 
         # 判断距离是否太远（避免离线太远也显示）
+        all_y = np.concatenate([trace.y for trace in self.lines.values()])
         dx = abs(event.xdata - x_near)
         dy = abs(event.ydata - y_near)
-        if dx > (xdata[-1] - xdata[0]) * 0.01 or dy > (max(ydata) - min(ydata)) * 0.05:
+        if dx > (xdata[-1] - xdata[0]) * 0.01 or dy > (np.nanmax(all_y) - np.nanmin(all_y)) * 0.05:
             self.annotation.set_visible(False)
-            self.draw_idle()
+            self.blit_hover()
             return
 
         # 设置tooltip文本和位置
-        text = f"Distance: {x_near:.2f} m\nTime: {y_near:.3f} s"
+        text = f"{lap.name}\nDistance: {x_near:.2f} m\nTime: {y_near:.3f} s"
         self.annotation.xy = (x_near, y_near)
         self.annotation.set_text(text)
         self.annotation.set_visible(True)
-        self.draw_idle()
+        self.blit_hover()
 
 class VisCanvas(FigureCanvas):
     def __init__(self):
@@ -181,6 +242,9 @@ class VisCanvas(FigureCanvas):
 
         self.mouse_distance = 0
 
+        # 要在 RectangleSelector 之前连上 draw_event，缓存的背景里才不会带着标记点
+        self.blitter = HoverBlitter(self, self.hover_artists, [self.ax])
+
         self.selector = RectangleSelector(
             self.ax, self.on_select,
             useblit=True, interactive=True,
@@ -192,6 +256,10 @@ class VisCanvas(FigureCanvas):
         self.mpl_connect('motion_notify_event', self.on_mouse_move)
         self.press_ctrl = False
         self._analyzer_update_cb = []
+        # 多圈比较时的参考圈
+        self.reference_index = 0
+        # 最近一次框选的距离范围，用来保存分段
+        self.last_selection = None
 
     # 直接读取x坐标，使拖动更平滑
     def on_mouse_move(self, event):
@@ -217,30 +285,37 @@ class VisCanvas(FigureCanvas):
                 ha="left", va="bottom",
                 color="white",
                 fontsize=9,
+                animated=True,
                 bbox=dict(facecolor="#4f4f4f", alpha=0.6, boxstyle="round,pad=0.3")
             )
         else:
             self._hover_anno.set_text(annotation_text)
-        self.draw_idle()
+        self.blit_hover()
 
     """func(instance,i)"""
     def register_instance_on_hover(self, func, i):
         self._analyzer_update_cb[i] = func
+
+    def hover_artists(self):
+        return [a.point for a in self.analyzers] + [getattr(self, "_hover_anno", None)]
+
+    def blit_hover(self):
+        self.blitter.request()
         
     def add_instance_by_df(self, name, data_frame)-> SDAnalyzer:
-        analyzer = SDAnalyzer(self.ax, name=name, data_frame=data_frame, color=colors[len(self.analyzers)])
+        analyzer = SDAnalyzer(self.ax, name=name, data_frame=data_frame, color=lap_color(len(self.analyzers)))
         analyzer.draw_line()
         return self.__add_instance(analyzer)
     
     def add_instance_by_file(self, file) -> SDAnalyzer:
-        analyzer = SDAnalyzer(self.ax, speed_distance_path=file, color=colors[len(self.analyzers)])
+        analyzer = SDAnalyzer(self.ax, speed_distance_path=file, color=lap_color(len(self.analyzers)))
         analyzer.draw_line()
         return self.__add_instance(analyzer)
     
     def __add_instance(self, analyzer) -> SDAnalyzer:
         self.analyzers.append(analyzer)
         self._analyzer_update_cb.append(None)
-        max_distance = max(i.df['distance'].max() for i in self.analyzers)
+        max_distance = max(i.df['distance'].max() + i.offset for i in self.analyzers)
         self.ax.set_xlim(0, max_distance)
         
         if self.cursor is not None:
@@ -288,17 +363,19 @@ class VisCanvas(FigureCanvas):
         self.ax.set_ylim(ydata - rely * new_height, ydata + (1 - rely) * new_height)
         self.draw_idle()
     
-    def exit_editor(self, df):
-        self.analyzers[0].df = regen_df_by_time_speed(df)
-        self.analyzers[0].adjust_distance(0)
+    def exit_editor(self, df, snapshot = None):
+        # 只改了几个速度时增量更新 distance/accel，删了行等情况再整体重建
+        if snapshot is None or not patch_df_by_time_speed(df, snapshot):
+            df = regen_df_by_time_speed(df, snapshot)
+        self.analyzers[0].replace_data(df)
         self.draw_idle()
         
     def on_select(self, eclick, erelease):
-        if len(self.analyzers) > 2:
+        if not self.analyzers:
             return
-        
         x1 = min(eclick.xdata, erelease.xdata)
         x2 = max(eclick.xdata, erelease.xdata)
+        self.last_selection = (x1, x2)
         # 删除太靠近的时间标签，防止看不清
         for t in self.delta_texts:
             x_text, _ = t.get_position()
@@ -308,17 +385,20 @@ class VisCanvas(FigureCanvas):
                 self.delta_texts.remove(t)
 
         if len(self.analyzers) == 1:
+            # 编辑器直接改 df，先把偏移写回
+            self.analyzers[0].materialize_offset()
             df = self.analyzers[0].df
             x_shifted = df['distance'].values
             mask = (x_shifted >= x1) & (x_shifted <= x2)
             selected_idx = df.index[mask].tolist()
+            snapshot = snapshot_rows(df, selected_idx)
         
             self.editor = DataEditor(
                 df,
                 x_name="distance",
                 y_name="speed",
                 index_list=selected_idx,
-                save_callback=self.exit_editor
+                save_callback=lambda edited: self.exit_editor(edited, snapshot)
             )
             
             def change_index(index):
@@ -329,35 +409,28 @@ class VisCanvas(FigureCanvas):
             self.editor.show()
             return
         
-        def get_segment(df):
-            x_shifted = df['distance'].values
-            y = df['speed'].values
-            mask = (x_shifted >= x1) & (x_shifted <= x2)
-            return x_shifted[mask], y[mask]
-
-        x1_seg, y1_seg = get_segment(self.analyzers[0].df)
-        x2_seg, y2_seg = get_segment(self.analyzers[1].df)
+        # 每一圈都要完整覆盖框选范围，否则 Δt 比的是截断的一段
+        def covers(analyzer: SDAnalyzer):
+            r = analyzer.get_distance_range()
+            return r is not None and r[0] <= x1 and r[1] >= x2
 
-        if len(x1_seg) < 2 or len(x2_seg) < 2:
+        if not all(covers(a) for a in self.analyzers):
             print("Not enough data in selection.")
             return
         
-        def compute_time(x, v):
-            v = v * 1000 / 3600  # km/h → m/s
-            v[v <= 0] = np.nan
-            dx = np.diff(x)
-            v_avg = (v[:-1] + v[1:]) / 2
-            dt = dx / v_avg
-            return np.nansum(dt)
-        
-        t1 = compute_time(x1_seg, y1_seg)
-        t2 = compute_time(x2_seg, y2_seg)
-        delta_t = t1 - t2
-
-        print(f"dt = t1 - t2 = {t1:.3f} - {t2:.3f} = {delta_t:.3f} s")
+        # 每一圈都和参考圈比较：Δt = t_ref - t_i
+        ref = min(self.reference_index, len(self.analyzers) - 1)
+        times = [a.elapsed_time(x1, x2) for a in self.analyzers]
+        others = [i for i in range(len(self.analyzers)) if i != ref]
+        for i in others:
+            print(f"dt = t_ref - t{i} = {times[ref]:.3f} - {times[i]:.3f} = {times[ref] - times[i]:.3f} s")
+        if len(others) == 1:
+            text = f"Δt = {times[ref] - times[others[0]]:.3f} s"
+        else:
+            text = "\n".join(f"{self.analyzers[i].name}: Δt = {times[ref] - times[i]:.3f} s" for i in others)
         txt = self.ax.text((x1 + x2) / 2, self.ax.get_ylim()[1]*0.9,
-                    f"Δt = {delta_t:.3f} s",
-                    ha='center', color='purple', fontsize=10,
+                    text,
+                    ha='center', va='baseline' if len(others) == 1 else 'top', color='purple', fontsize=10,
                     bbox=dict(facecolor='white', alpha=0.6))
         self.delta_texts.append(txt)
         self.fig.canvas.draw_idle()
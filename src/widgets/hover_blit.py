@@ -0,0 +1,53 @@
+from matplotlib.backend_bases import FigureCanvasBase
+
+class HoverBlitter():
+    """
+    悬停时只重画会动的 artist（标记点、提示框）：每次完整重绘后缓存不含它们的背景，
+    之后 restore_region + draw_artist + blit。缩放、resize、数据变化都会触发完整重绘重新缓存。
+    这些 artist 要设 animated=True，完整重绘时跳过，由这里画上去
+    """
+    def __init__(self, canvas: FigureCanvasBase, artists, axes = ()):
+        self.canvas = canvas
+        # () -> 当前会动的 artist，懒创建还没出现的可以是 None
+        self.artists = artists
+        self.background = None
+        self._pending = False
+        self._timer = canvas.new_timer(interval=0)
+        self._timer.single_shot = True
+        self._timer.add_callback(self.blit)
+        canvas.mpl_connect("draw_event", self.on_draw)
+        canvas.mpl_connect("resize_event", self.invalidate)
+        for ax in axes:
+            ax.callbacks.connect("xlim_changed", self.invalidate)
+            ax.callbacks.connect("ylim_changed", self.invalidate)
+
+    def invalidate(self, *args):
+        self.background = None
+
+    def _draw_artists(self):
+        figure = self.canvas.figure
+        for artist in self.artists():
+            if artist is not None and artist.figure is figure:
+                figure.draw_artist(artist)
+
+    def on_draw(self, event):
+        if self.canvas.is_saving():
+            return
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._draw_artists()
+
+    def blit(self):
+        self._pending = False
+        if self.background is None:
+            # 背景过期，等下一次完整重绘
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_artists()
+        self.canvas.blit(self.canvas.figure.bbox)
+
+    def request(self):
+        """blit on the next event loop pass, several requests in one mouse move are merged"""
+        if not self._pending:
+            self._pending = True
+            self._timer.start()
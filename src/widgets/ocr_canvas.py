@@ -4,7 +4,7 @@ import numpy as np
 from PyQt5.QtWidgets import QApplication, QLabel, QMainWindow, QSlider
 from PyQt5.QtGui import QPixmap, QImage, QPainter, QPen, QColor
 from PyQt5.QtCore import Qt, QRect, pyqtSignal, QPoint
-from core.video_wrapper import VideoWrapper
+from core.video_wrapper import VideoWrapper, RoiVideo
 import copy
 
 class VideoSlider(QSlider):
@@ -46,30 +46,6 @@ def cvimg_to_qt(img):
     bytes_per_line = ch * w
     return QImage(img.data, w, h, bytes_per_line, QImage.Format_BGR888)
 
-class RoiVideo():
-    def __init__(self,video:VideoWrapper, frame_idx: int, roi:tuple):
-        self.video = video.copy()
-        self.roi = roi
-        self.frame_index = frame_idx
-        self.video.set_frame(self.frame_index)
-
-    def get_next_processed_frame(self):
-        self.frame_index = self.frame_index + 1
-        self.frame = self.video.get_next_frame()
-        if self.frame is None:
-            return None
-
-        x, y, w, h = self.roi
-        return self.frame[y:y+h, x:x+w].copy()
-    
-    def set_new_value(self, idx, roi):
-        self.frame_index = idx
-        self.video.set_frame(self.frame_index)
-        self.roi=roi
-
-    def get_cur_index(self):
-        return self.frame_index
-
 class OCRCanvas(QLabel):
     def __init__(self, video_path: str):
         super().__init__()